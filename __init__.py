@@ -1,7 +1,11 @@
+import importlib
 import logging
+import os
+import sys
 import typing
+from contextlib import contextmanager
 
-from ableton.v3.base import const, inject
+from ableton.v3.base import const, depends, inject, listens, task
 from ableton.v3.control_surface import (
     ControlSurface,
     ControlSurfaceSpecification,
@@ -19,28 +23,66 @@ from ableton.v3.control_surface.capabilities import (
 )
 from ableton.v3.control_surface.legacy_bank_definitions import best_of_banks
 
-from .colors import Skin
+from .capture import MidiCapture
+from .colors import FlatSkin, Skin
 from .configuration import Configuration
-from .elements import NUM_SCENES, NUM_TRACKS, Elements
-from .mappings import create_mappings
+from .deferred_updates import DeferredUpdates
+from .device import DeviceComponent
+from .elements import CONTROL_FIELDS, NUM_SCENES, NUM_TRACKS, Elements
+from .instrumentation import MidiTrafficMonitor, StartupProfiler
+from .log_buffer import RingBufferLogHandler
+from .mappings import ALT_BUTTON, CTRL_BUTTON, SHIFT_BUTTON, create_mappings
 from .mixer import MixerComponent
+from .output import LedOutput
+from .tracing import disable_tracing, enable_tracing, get_tracer
 from .transport import TransportComponent
 
 logger = logging.getLogger(__name__)
 
+# Settings which are read whenever they're used, so that
+# `NK2Reshift.reload_configuration` can apply changes to them in
+# place, along with control mappings.
+RELOADABLE_SETTINGS = ("solo_meter_threshold",)
+
+USER_CONFIGURATION_PATH = os.path.join(os.path.dirname(__file__), "user.py")
+
+# How often (in seconds) to check `user.py` for changes, if enabled.
+USER_CONFIGURATION_POLL_INTERVAL = 1.0
+
+
+# Resolve a path from the configuration relative to this directory.
+def _resolve_path(path: str) -> str:
+    return os.path.join(os.path.dirname(__file__), path)
+
+
 # Load a local configuration if possible, or fall back to the default.
-_local_configuration: typing.Union[None, Configuration] = None
-try:
-    from .user import (  # type: ignore
-        configuration as _local_configuration,  # type: ignore
-    )
+# When reloading, import errors are raised instead, so that the caller
+# can keep the current configuration.
+def _load_configuration(reload: bool = False) -> Configuration:
+    try:
+        # Only reload if a previous import succeeded, otherwise the
+        # first import already runs the current `user.py`.
+        user = sys.modules.get(f"{__name__}.user")
+        if reload and user is not None:
+            user = importlib.reload(user)
+        else:
+            user = importlib.import_module(".user", __name__)
+    except (ImportError, ModuleNotFoundError):
+        if reload:
+            raise
+        logger.info("loaded default configuration")
+        return Configuration()
 
     logger.info("loaded local configuration")
+    return user.configuration
 
-except (ImportError, ModuleNotFoundError):
-    logger.info("loaded default configuration")
 
-_configuration: Configuration = _local_configuration or Configuration()
+_configuration: Configuration = _load_configuration()
+
+# Time taken to import this package, if it was measured by the
+# importer (e.g. the benchmark harness, but not Live). Reported as
+# part of the startup timings when set.
+import_time: typing.Optional[float] = None
 
 
 def get_capabilities():
@@ -63,14 +105,25 @@ def create_instance(c_instance):
     return NK2Reshift(c_instance=c_instance)
 
 
+# The framework turns the mappings into modes and layers (creating any
+# components they reference) after this returns, so the "mappings"
+# startup phase lasts until the end of initialization.
+def _create_mappings(control_surface: "NK2Reshift"):
+    control_surface.startup_profiler.mark("mappings")
+    return create_mappings(control_surface)
+
+
 class Specification(ControlSurfaceSpecification):
     identity_response_id_bytes = (0x42, 0x13, 0x01)
     elements_type = Elements
-    control_surface_skin = create_skin(skin=Skin)
+    # Compiled to a flat name-to-color table, so that redraws only need
+    # a single lookup.
+    control_surface_skin = FlatSkin(create_skin(skin=Skin), Skin)
     num_tracks = NUM_TRACKS
     num_scenes = NUM_SCENES
-    create_mappings_function = create_mappings
+    create_mappings_function = _create_mappings
     component_map = {
+        "Device": DeviceComponent,
         "Mixer": MixerComponent,
         "Transport": TransportComponent,
     }
@@ -82,8 +135,93 @@ class Specification(ControlSurfaceSpecification):
 
 class NK2Reshift(ControlSurface):
     def __init__(self, *a, **k):
+        # Components are created during base initialization, so this
+        # needs to exist beforehand.
+        self._deferred_updates = DeferredUpdates()
+
+        # Modification time of `user.py` when it was last loaded, if
+        # watching for changes.
+        self._user_configuration_mtime: typing.Optional[float] = None
+
+        # The identity response from the first identification. Used to
+        # recognize the same device when it's reconnected.
+        self._identity_response_bytes: typing.Optional[typing.Tuple[int, ...]] = None
+
+        # Only created if a log path is set in the configuration.
+        self._log_handler: typing.Optional[RingBufferLogHandler] = None
+        if _configuration.log_path is not None:
+            self._install_log_handler(_resolve_path(_configuration.log_path))
+
+        if _configuration.handler_tracing:
+            enable_tracing()
+
+        # Only created if a capture path is set in the configuration.
+        self._midi_capture: typing.Optional[MidiCapture] = None
+        if _configuration.midi_capture_path is not None:
+            self._midi_capture = MidiCapture(
+                _resolve_path(_configuration.midi_capture_path), _configuration
+            )
+
+        self.startup_profiler = StartupProfiler()
+        self.startup_profiler.mark("initialization")
+
         super().__init__(*a, specification=Specification, **k)
 
+        self._record_initialization_timings()
+
+    # Send the package's log messages to a file via a ring buffer,
+    # rather than to Live's log.
+    def _install_log_handler(self, path: str):
+        self._log_handler = RingBufferLogHandler(path)
+        self._log_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+        logger.addHandler(self._log_handler)
+
+        # Restored when the handler is uninstalled.
+        self._previous_logger_settings = (logger.propagate, logger.level)
+        logger.propagate = False
+        if _configuration.debug_logging:
+            logger.setLevel(logging.DEBUG)
+
+    def _uninstall_log_handler(self):
+        if self._log_handler is not None:
+            logger.removeHandler(self._log_handler)
+            logger.propagate, level = self._previous_logger_settings
+            logger.setLevel(level)
+            self._log_handler.close()
+            self._log_handler = None
+
+    # Split base initialization into element creation, mapping
+    # creation, `setup()` (if the base class runs it during
+    # initialization), and everything else, which is mostly component
+    # creation.
+    def _record_initialization_timings(self):
+        profiler = self.startup_profiler
+        profiler.mark("initialized")
+
+        timings = profiler.timings
+        setup_time = timings.get("setup", 0.0)
+        mappings_time = profiler.between(
+            "mappings", "setup" if "setup" in timings else "initialized"
+        )
+        assert isinstance(self.elements, Elements)
+        elements_time = self.elements.construction_time
+        components_time = (
+            profiler.between("initialization", "initialized")
+            - elements_time
+            - mappings_time
+            - setup_time
+        )
+
+        if import_time is not None:
+            profiler.record("imports", import_time)
+        profiler.record("elements", elements_time)
+        profiler.record("components", components_time)
+        profiler.record("mappings", mappings_time)
+        if "setup" in timings:
+            profiler.record("setup", setup_time)
+
     # Dependencies to be injected throughout the application.
     #
     # We need the `Any` return type because otherwise the type checker
@@ -93,7 +231,10 @@ class NK2Reshift(ControlSurface):
             super()._get_additional_dependencies() or {}
         )
 
-        deps["configuration"] = const(_configuration)
+        # Resolved on each lookup, so that components see the current
+        # configuration after `reload_configuration`.
+        deps["configuration"] = lambda *_a, **_k: _configuration
+        deps["deferred_updates"] = const(self._deferred_updates)
 
         return deps
 
@@ -105,10 +246,229 @@ class NK2Reshift(ControlSurface):
         with inject(configuration=const(_configuration)).everywhere():
             return super(NK2Reshift, NK2Reshift)._create_elements(specification)
 
+    # Collect component updates and LED output during input events
+    # and scheduler ticks. Deferred updates are flushed first, so that
+    # the LEDs they draw go out in the same burst, and only the final
+    # state of each LED gets sent to the device.
+    def receive_midi(self, midi_bytes):
+        if self._midi_capture is not None:
+            self._midi_capture.record_midi(midi_bytes)
+        with self._frame():
+            super().receive_midi(midi_bytes)
+
+    def update_display(self):
+        with self._frame():
+            super().update_display()
+        if self._midi_capture is not None:
+            self._midi_capture.flush_if_due()
+
+    @contextmanager
+    def _frame(self):
+        with self._led_output.frame(), self._deferred_updates.deferring():
+            yield
+
+    @property
+    def _led_output(self) -> LedOutput:
+        assert isinstance(self.elements, Elements)
+        return self.elements.led_output
+
+    @property
+    def _traffic_monitor(self) -> typing.Optional[MidiTrafficMonitor]:
+        assert isinstance(self.elements, Elements)
+        return self.elements.traffic_monitor
+
+    # Log a snapshot of MIDI traffic counters, if instrumentation is
+    # enabled in the configuration.
+    def log_midi_traffic(self):
+        if self._traffic_monitor is not None:
+            self._traffic_monitor.log_snapshot(logger)
+
+    # Write a snapshot of MIDI traffic counters to a JSON file, if
+    # instrumentation is enabled in the configuration.
+    def write_midi_traffic(self, path: str):
+        if self._traffic_monitor is not None:
+            self._traffic_monitor.write_snapshot(path)
+
+    def reload_configuration(self) -> bool:
+        """
+        Re-import the configuration from `user.py`, and rebind any controls whose
+        mappings changed. Components (and e.g. the session ring position) are left
+        alone, and the device doesn't need to be identified again.
+
+        Returns False if the changes can't be applied in place (i.e. a setting other
+        than a control mapping or one of `RELOADABLE_SETTINGS` changed, or a control's
+        message type or map mode changed), in which case the control surface needs to
+        be reloaded in Live. Also returns False, keeping the current configuration, if
+        `user.py` can't be imported or maps two controls to the same message.
+        """
+        global _configuration
+
+        try:
+            configuration = _load_configuration(reload=True)
+        except Exception:
+            # e.g. `user.py` was removed, or has a syntax error while
+            # being edited.
+            logger.exception("failed to reload configuration, keeping current one")
+            return False
+        changed_fields = [
+            field
+            for field in Configuration._fields
+            if getattr(configuration, field) != getattr(_configuration, field)
+        ]
+        if not changed_fields:
+            return True
+
+        is_reloadable = set(changed_fields) <= {*CONTROL_FIELDS, *RELOADABLE_SETTINGS}
+
+        assert isinstance(self.elements, Elements)
+        with self._frame():
+            try:
+                is_reconfigured = is_reloadable and self.elements.reconfigure(
+                    configuration
+                )
+            except ValueError as error:
+                # e.g. two controls mapped to the same message.
+                logger.warning(f"invalid configuration, keeping current one: {error}")
+                return False
+            if not is_reconfigured:
+                logger.warning(
+                    "configuration changes require a reload: "
+                    + ", ".join(changed_fields)
+                )
+                return False
+
+            _configuration = configuration
+            self._led_output.update_priority_keys()
+            self.request_rebuild_midi_map()
+            self.update()
+
+        logger.info(f"reloaded configuration: {', '.join(changed_fields)}")
+        return True
+
+    @depends(parent_task_group=None)
+    def _watch_user_configuration(self, parent_task_group=None):
+        assert parent_task_group
+        self._user_configuration_mtime = self._get_user_configuration_mtime()
+        parent_task_group.add(
+            task.loop(
+                task.sequence(
+                    task.wait(USER_CONFIGURATION_POLL_INTERVAL),
+                    task.run(self._check_user_configuration),
+                )
+            )
+        )
+
+    def _check_user_configuration(self):
+        mtime = self._get_user_configuration_mtime()
+        if mtime == self._user_configuration_mtime:
+            return
+        self._user_configuration_mtime = mtime
+        self.reload_configuration()
+
+    @staticmethod
+    def _get_user_configuration_mtime() -> typing.Optional[float]:
+        try:
+            return os.path.getmtime(USER_CONFIGURATION_PATH)
+        except OSError:
+            return None
+
+    # Log latency percentiles of traced handlers, if tracing is enabled
+    # in the configuration.
+    def log_handler_latencies(self):
+        tracer = get_tracer()
+        if tracer is not None:
+            tracer.log_snapshot(logger)
+
+    # Write latency percentiles of traced handlers to a JSON file, if
+    # tracing is enabled in the configuration.
+    def write_handler_latencies(self, path: str):
+        tracer = get_tracer()
+        if tracer is not None:
+            tracer.write_snapshot(path)
+
     def setup(self):
+        self.startup_profiler.mark("setup")
         super().setup()
+
+        # Mode button feedback is sent ahead of other LEDs when output
+        # is rate limited.
+        for button_name in (SHIFT_BUTTON, ALT_BUTTON, CTRL_BUTTON):
+            self._led_output.add_priority_element(getattr(self.elements, button_name))
+
+        if _configuration.watch_user_configuration:
+            self._watch_user_configuration()
+
+        if _configuration.blink_steps_per_beat > 0:
+            self.elements.blink_manager.start_tempo_sync(
+                self.song, _configuration.blink_steps_per_beat
+            )
+
+        if self._traffic_monitor is not None or self._midi_capture is not None:
+            self.__on_selected_mode_changed.subject = self.component_map["Modes"]
+            self.__on_selected_mode_changed()
+
+        self.startup_profiler.record("setup", self.startup_profiler.since("setup"))
+        self.startup_profiler.mark("identification")
+
         logger.info(f"{self.__class__.__name__} setup complete")
 
+    def disconnect(self):
+        self.elements.blink_manager.disconnect()
+        self.log_midi_traffic()
+        self.log_handler_latencies()
+        disable_tracing()
+        super().disconnect()
+        if self._midi_capture is not None:
+            self._midi_capture.close()
+        self._uninstall_log_handler()
+
+    @listens("selected_mode")
+    def __on_selected_mode_changed(self, *_):
+        selected_mode = self.component_map["Modes"].selected_mode
+        if self._traffic_monitor is not None:
+            self._traffic_monitor.mode = selected_mode
+        if self._midi_capture is not None:
+            self._midi_capture.record_mode(selected_mode)
+
+    # Called by Live when MIDI ports are (re)opened, e.g. after the
+    # device is reconnected. If the device has already been identified,
+    # the last known LED state is sent right away, rather than waiting
+    # for the identity response and a full redraw.
+    def port_settings_changed(self):
+        if self._identity_response_bytes is not None:
+            self._led_output.replay()
+        super().port_settings_changed()
+
     def on_identified(self, response_bytes):
+        response_bytes = tuple(response_bytes)
+        if (
+            self._identity_response_bytes is not None
+            and response_bytes == self._identity_response_bytes
+        ):
+            # The same device has been reconnected, and its LEDs have
+            # already been restored by `port_settings_changed`. Only
+            # send LEDs whose state differs from what was replayed.
+            # Component updates are deferred until the end of the
+            # current frame, so they're run here to draw while the
+            # shadow is still trusted.
+            with self._led_output.trusting_shadow():
+                super().on_identified(response_bytes)
+                self._deferred_updates.flush_now()
+            logger.info("reconnected nanoKONTROL2 device")
+            return
+
+        if self._identity_response_bytes is not None:
+            # A different device, so the replayed LED state can't be
+            # trusted.
+            self._led_output.clear_shadow()
+        self._identity_response_bytes = response_bytes
+
         super().on_identified(response_bytes)
         logger.info("identified nanoKONTROL2 device")
+
+        # Only the first identification is part of startup.
+        if "identification" not in self.startup_profiler.timings:
+            self.startup_profiler.record(
+                "identification", self.startup_profiler.since("identification")
+            )
+            self.startup_profiler.log(logger)
@@ -0,0 +1,68 @@
+# Benchmarks for NK2Reshift, run against the headless harness. Each
+# benchmark is a module which can be run with e.g.
+#
+#   python -m benchmarks.mode_transitions
+#
+# Results are printed, and written as JSON to `benchmark-results/`
+# (or the path given with `--output`) so they can be compared across
+# changes.
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import time
+import typing
+from pathlib import Path
+
+RESULTS_DIR = Path("benchmark-results")
+
+
+def argument_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="path of the JSON results file",
+    )
+    return parser
+
+
+# Summary statistics for a list of durations in seconds, reported in
+# microseconds.
+def summarize(durations: typing.Sequence[float]) -> typing.Dict[str, float]:
+    ordered = sorted(durations)
+    if not ordered:
+        return {}
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1e6
+
+    return {
+        "count": len(ordered),
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "median_us": percentile(0.5),
+        "p95_us": percentile(0.95),
+        "max_us": ordered[-1] * 1e6,
+    }
+
+
+def write_results(
+    name: str, results: typing.Any, output: typing.Optional[Path] = None
+) -> Path:
+    path = output or RESULTS_DIR / f"{name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(
+            {
+                "benchmark": name,
+                "timestamp": time.time(),
+                "python": platform.python_version(),
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    return path
@@ -0,0 +1,156 @@
+# Checks that steady-state blinking doesn't allocate memory, using
+# tracemalloc.
+#
+# The blink manager's own per-tick bookkeeping is measured with no-op
+# listeners, and must not allocate anything within a tick. The full
+# path (blink manager, buttons and LED output, driven by the control
+# surface's scheduler ticks with the session full of playing and
+# triggered clips) is measured separately for ticks which send MIDI
+# and quiet ticks which don't. It must retain nothing from tick to
+# tick. Its transient allocations (e.g. the MIDI messages themselves,
+# or the framework's scheduling) show up in the peaks, which are
+# reported.
+#
+# Exits with an error if either check fails, so this also runs as
+# part of `make check`.
+from __future__ import annotations
+
+import tracemalloc
+import typing
+
+from harness import Harness, load_script
+
+from . import argument_parser, write_results
+from .skin_lookup import populate_clip_slots
+
+NUM_VALUE_GENERATORS = 24
+
+
+def _ignore_value(_value: int):
+    pass
+
+
+# Run the function once per tick, and return the largest allocation
+# within a tick and the memory retained across all ticks, in bytes.
+# Ticks are split by whether `is_quiet` returns True afterwards.
+def measure_ticks(
+    tick: typing.Callable[[], typing.Any],
+    ticks: int,
+    is_quiet: typing.Callable[[], bool] = lambda: True,
+) -> typing.Dict[str, float]:
+    quiet_peak = 0
+    sending_peak = 0
+    num_quiet_ticks = 0
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for tick_index in range(ticks + 1):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            tick()
+            _, peak = tracemalloc.get_traced_memory()
+
+            # The first measurement includes the measuring code's own
+            # first allocations, so it's left out of the peaks.
+            if tick_index == 0:
+                is_quiet()
+            elif is_quiet():
+                num_quiet_ticks += 1
+                quiet_peak = max(quiet_peak, peak - start)
+            else:
+                sending_peak = max(sending_peak, peak - start)
+
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return dict(
+        quiet_ticks=float(num_quiet_ticks),
+        quiet_peak_bytes=float(quiet_peak),
+        sending_peak_bytes=float(sending_peak),
+        retained_bytes_per_tick=(current - baseline) / ticks,
+    )
+
+
+def measure_bookkeeping(package, ticks: int) -> typing.Dict[str, float]:
+    colors = package.colors
+    blink_manager = colors.BlinkManager(colors.BLINK_CYCLE_TICKS)
+    patterns = (colors.BLINK.pattern, colors.BLINK_FAST.pattern)
+    value_generators = [
+        blink_manager.get_value_generator(patterns[i % len(patterns)], _ignore_value)
+        for i in range(NUM_VALUE_GENERATORS)
+    ]
+
+    # Warm up, i.e. notify pending value generators and build
+    # snapshots.
+    for _ in range(blink_manager.cycle_ticks):
+        blink_manager._on_tick()
+
+    result = measure_ticks(blink_manager._on_tick, ticks)
+
+    for value_generator in value_generators:
+        value_generator.disconnect()
+    return result
+
+
+def measure_full_path(harness: Harness, ticks: int) -> typing.Dict[str, float]:
+    populate_clip_slots(harness)
+    harness.tick(harness.package.colors.BLINK_CYCLE_TICKS)
+    harness.clear_sent_midi()
+
+    num_messages = 0
+
+    # Sent messages are dropped after each tick, so that the harness's
+    # record of them doesn't count as retained memory.
+    def is_quiet() -> bool:
+        nonlocal num_messages
+        sent = len(harness.sent_midi)
+        num_messages += sent
+        harness.clear_sent_midi()
+        return sent == 0
+
+    result = measure_ticks(harness.tick, ticks, is_quiet)
+    result["midi_messages_per_tick"] = num_messages / ticks
+    return result
+
+
+def run(ticks: int) -> typing.Dict[str, typing.Any]:
+    package = load_script()
+    harness = Harness()
+    harness.identify()
+    harness.tick()
+
+    results = {
+        "bookkeeping": measure_bookkeeping(package, ticks),
+        "full_path": measure_full_path(harness, ticks),
+    }
+    harness.disconnect()
+    return results
+
+
+def main():
+    parser = argument_parser("Check per-tick memory allocations while blinking.")
+    parser.add_argument("--ticks", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = run(args.ticks)
+    for name, result in results.items():
+        print(
+            f"{name:>11}: {result['quiet_peak_bytes']:8.0f} bytes peak on quiet "
+            f"ticks, {result['sending_peak_bytes']:8.0f} bytes peak on sending "
+            f"ticks, {result['retained_bytes_per_tick']:8.1f} bytes retained per tick"
+        )
+    print(f"wrote {write_results('blink_allocations', results, args.output)}")
+
+    for name, result in results.items():
+        if result["retained_bytes_per_tick"] > 0:
+            raise SystemExit(f"{name}: memory was retained across ticks")
+
+    bookkeeping = results["bookkeeping"]
+    if bookkeeping["quiet_peak_bytes"] > 0 or bookkeeping["sending_peak_bytes"] > 0:
+        raise SystemExit("bookkeeping: memory was allocated within a tick")
+
+
+if __name__ == "__main__":
+    main()
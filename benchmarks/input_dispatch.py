@@ -0,0 +1,78 @@
+# Measures input dispatch throughput for bursts of mixed note, CC and
+# pitch bend messages (one message for every button, knob and slider
+# in the configuration), through the framework's routing. Messages are
+# passed straight to the control surface, regardless of whether Live
+# would map them itself.
+#
+# Input isn't dispatched through an index of our own, so this is a
+# baseline for the framework's routing rather than a comparison.
+from __future__ import annotations
+
+import time
+import typing
+
+from harness import Harness, load_script
+
+from . import argument_parser, summarize, write_results
+
+
+def burst(harness: Harness) -> typing.List[typing.Tuple[int, ...]]:
+    configuration = harness.package._configuration
+    configurations = []
+    for field in harness.package.CONTROL_FIELDS:
+        value = getattr(configuration, field)
+        configurations.extend(value if isinstance(value, list) else [value])
+
+    # The package's `elements` submodule.
+    status_bytes = harness.package.elements.STATUS_BYTES
+    messages = []
+    for control_configuration in configurations:
+        status = status_bytes[control_configuration.msg_type]
+        status |= control_configuration.channel
+        if status & 0xF0 == 0xE0:
+            messages.append((status, 0x00, 0x40))
+        else:
+            # Release rather than press, so that buttons don't change
+            # modes or fire clips.
+            messages.append((status, control_configuration.identifier, 0))
+    return messages
+
+
+def measure(iterations: int) -> typing.Dict[str, typing.Any]:
+    load_script()
+    harness = Harness()
+    harness.identify()
+    harness.tick()
+
+    messages = burst(harness)
+    durations = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        for midi_bytes in messages:
+            harness.surface.receive_midi(midi_bytes)
+        durations.append(time.perf_counter() - start_time)
+
+    harness.disconnect()
+
+    result = summarize(durations)
+    result["messages_per_burst"] = len(messages)
+    result["messages_per_second"] = len(messages) * len(durations) / sum(durations)
+    return result
+
+
+def main():
+    parser = argument_parser("Measure input dispatch throughput.")
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    result = measure(args.iterations)
+    print(
+        f"{result['median_us']:9.1f}us median per burst of "
+        f"{result['messages_per_burst']} messages, "
+        f"{result['messages_per_second']:9.0f} messages/s"
+    )
+    print(f"wrote {write_results('input_dispatch', result, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Measures the MIDI output of the solo-row meters (see `solo_meters`
+# in the configuration), alongside the blink traffic from a session
+# full of playing and triggered clips.
+#
+# Each scenario runs a number of scheduler ticks with randomized but
+# repeatable meter levels on every track, and reports output messages
+# per tick and per second (at Live's 10 ticks per second), overall and
+# per element from the MIDI traffic monitor.
+from __future__ import annotations
+
+import random
+import typing
+
+from harness import Harness, load_script
+
+from . import argument_parser, write_results
+from .mode_transitions import enter_mode
+from .skin_lookup import populate_clip_slots
+
+TICKS_PER_SECOND = 10
+
+# Scenarios as (mode, solo_meters).
+SCENARIOS = {
+    "default_blinking": ("default", False),
+    "shift_solo": ("shift", False),
+    "shift_meters": ("shift", True),
+}
+
+
+# Meter levels for all tracks. Each track gets a random hit on some
+# ticks, which then falls off, roughly like a percussive signal.
+class MeterSignal:
+    def __init__(self, tracks: typing.Sequence[typing.Any], seed: int = 0):
+        self._tracks = tracks
+        self._random = random.Random(seed)
+
+    def tick(self):
+        for track in self._tracks:
+            if self._random.random() < 0.2:
+                track.output_meter_level = self._random.uniform(0.7, 1.0)
+            else:
+                track.output_meter_level *= 0.8
+
+
+def run_scenario(
+    mode: str, solo_meters: bool, ticks: int
+) -> typing.Dict[str, typing.Any]:
+    package = load_script()
+    configuration = package._configuration._replace(
+        solo_meters=solo_meters, midi_instrumentation=True
+    )
+    harness = Harness(configuration=configuration)
+    harness.identify()
+    harness.tick()
+
+    populate_clip_slots(harness)
+    enter_mode(harness, mode)
+    signal = MeterSignal(harness.song.tracks)
+
+    # Let initial redraws settle before measuring.
+    harness.tick(package.colors.BLINK_CYCLE_TICKS)
+    harness.clear_sent_midi()
+
+    monitor = harness.surface.elements.traffic_monitor
+    assert monitor is not None
+    start_counts = monitor.snapshot()["per_element"]
+
+    messages_per_tick = []
+    for _ in range(ticks):
+        signal.tick()
+        sent_before = len(harness.sent_midi)
+        harness.tick()
+        messages_per_tick.append(len(harness.sent_midi) - sent_before)
+
+    per_element = {}
+    for name, counts in monitor.snapshot()["per_element"].items():
+        start = start_counts.get(name, {}).get("messages_out", 0)
+        if counts["messages_out"] > start:
+            per_element[name] = counts["messages_out"] - start
+
+    harness.disconnect()
+
+    total = sum(messages_per_tick)
+    return dict(
+        ticks=ticks,
+        messages=total,
+        mean_messages_per_tick=total / ticks,
+        max_messages_per_tick=max(messages_per_tick),
+        messages_per_second=total / ticks * TICKS_PER_SECOND,
+        per_element=per_element,
+    )
+
+
+def main():
+    parser = argument_parser("Measure LED output with solo-row meters.")
+    parser.add_argument("--ticks", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = {
+        name: run_scenario(mode, solo_meters, args.ticks)
+        for name, (mode, solo_meters) in SCENARIOS.items()
+    }
+    for name, result in results.items():
+        print(
+            f"{name:>16}: {result['mean_messages_per_tick']:6.2f} messages/tick "
+            f"(max {result['max_messages_per_tick']}), "
+            f"{result['messages_per_second']:7.1f} messages/s"
+        )
+
+    budget = load_script()._configuration.midi_output_messages_per_ms
+    if budget > 0:
+        print(f"{'output budget':>16}: {budget * 1000:7.1f} messages/s")
+
+    print(f"wrote {write_results('meter_traffic', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Measures the cost of every mode-to-mode transition, driven through
+# the mode buttons like on the hardware. Transitions out of default
+# mode go through the `*_from_default` wrapper modes.
+from __future__ import annotations
+
+import itertools
+import time
+import typing
+
+from harness import Harness, load_script
+
+from . import argument_parser, summarize, write_results
+
+MODES = ("default", "shift", "alt", "ctrl")
+
+# Configuration attribute of the button which selects each mode.
+MODE_BUTTONS = {
+    "shift": "stop_button",
+    "alt": "play_button",
+    "ctrl": "record_button",
+}
+
+
+# Count `update()` calls on every component created after this is
+# installed, by wrapping the bound method on each instance. This counts
+# each update once, regardless of `super()` chains.
+class UpdateCounter:
+    def __init__(self):
+        self.count = 0
+
+        from ableton.v3.control_surface import Component
+
+        original_init = Component.__init__
+        counter = self
+
+        def init(component, *a, **k):
+            original_init(component, *a, **k)
+            update = component.update
+
+            def counted_update(*a, **k):
+                counter.count += 1
+                return update(*a, **k)
+
+            component.update = counted_update
+
+        Component.__init__ = init
+
+
+def press(harness: Harness, button_name: str):
+    configuration = harness.package._configuration
+    button = getattr(configuration, button_name)
+
+    # MIDI_NOTE_TYPE is 0, MIDI_CC_TYPE is 1.
+    status = (0x90 if button.msg_type == 0 else 0xB0) | button.channel
+    harness.send_midi(status, button.identifier, 127)
+    harness.send_midi(status, button.identifier, 0)
+
+
+# The button which moves from one mode to another.
+def transition_button(from_mode: str, to_mode: str) -> str:
+    if to_mode == "default":
+        return MODE_BUTTONS[from_mode]
+    return MODE_BUTTONS[to_mode]
+
+
+def selected_mode(harness: Harness) -> str:
+    return harness.surface.component_map["Modes"].selected_mode
+
+
+def enter_mode(harness: Harness, mode: str):
+    current = selected_mode(harness)
+    if current != "default":
+        press(harness, transition_button(current, "default"))
+    if mode != "default":
+        press(harness, transition_button("default", mode))
+    assert selected_mode(harness) == mode
+
+
+def run(iterations: int) -> typing.Dict[str, typing.Any]:
+    load_script()
+    counter = UpdateCounter()
+    harness = Harness()
+    harness.identify()
+    harness.tick()
+
+    results = {}
+    for from_mode, to_mode in itertools.permutations(MODES, 2):
+        durations = []
+        updates = 0
+        messages = 0
+        for _ in range(iterations):
+            enter_mode(harness, from_mode)
+            harness.tick()
+
+            counter.count = 0
+            harness.clear_sent_midi()
+            start_time = time.perf_counter()
+            press(harness, transition_button(from_mode, to_mode))
+            durations.append(time.perf_counter() - start_time)
+            updates += counter.count
+            messages += len(harness.sent_midi)
+
+            assert selected_mode(harness) == to_mode
+
+        results[f"{from_mode}->{to_mode}"] = dict(
+            **summarize(durations),
+            updates_per_transition=updates / iterations,
+            midi_messages_per_transition=messages / iterations,
+        )
+
+    harness.disconnect()
+    return results
+
+
+def main():
+    parser = argument_parser("Measure the cost of every mode-to-mode transition.")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for transition, result in results.items():
+        print(
+            f"{transition:>16}: {result['median_us']:9.1f}us median, "
+            f"{result['p95_us']:9.1f}us p95, "
+            f"{result['updates_per_transition']:6.1f} updates, "
+            f"{result['midi_messages_per_transition']:6.1f} MIDI messages"
+        )
+    print(f"wrote {write_results('mode_transitions', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Replays a MIDI capture (see `midi_capture_path` in the configuration)
+# against the control surface, as a repeatable load test. Input is fed
+# at the recorded pace (--speed 1), N times faster (--speed N), or as
+# fast as possible (--speed 0). Scheduler ticks are run every 100ms of
+# capture time at any speed, so the same work is done in each case.
+#
+# The control surface runs with the configuration the capture was
+# recorded with, or the default one for captures which don't include
+# it.
+#
+#   python -m benchmarks.replay path/to/capture.bin --speed 0
+from __future__ import annotations
+
+import os
+import time
+import typing
+
+from harness import Harness, load_script
+
+from . import argument_parser, summarize, write_results
+
+TICK_INTERVAL = 0.1
+
+
+def selected_mode(harness: Harness) -> str:
+    return harness.surface.component_map["Modes"].selected_mode
+
+
+# Last value sent for each LED, keyed by "status:identifier".
+def final_led_state(harness: Harness) -> typing.Dict[str, int]:
+    state = {}
+    for _, midi_bytes in harness.sent_midi:
+        if len(midi_bytes) == 3 and midi_bytes[0] & 0xF0 in (0x90, 0xB0):
+            state[f"{midi_bytes[0]}:{midi_bytes[1]}"] = midi_bytes[2]
+    return state
+
+
+def run(path: str, speed: float) -> typing.Dict[str, typing.Any]:
+    package = load_script()
+    capture = package.capture
+    records = list(capture.read_capture(path))
+
+    configuration = next(
+        (r.configuration for r in records if r.kind == capture.CONFIGURATION_RECORD),
+        package.configuration.Configuration(),
+    )
+    # Keep capturing, so that encoder input still goes through the
+    # script, but don't overwrite anything.
+    harness = Harness(
+        configuration=configuration._replace(midi_capture_path=os.devnull)
+    )
+
+    input_durations: typing.List[float] = []
+    tick_durations: typing.List[float] = []
+    mode_mismatches = 0
+    next_tick_time = TICK_INTERVAL
+
+    start_time = time.perf_counter()
+    for record in records:
+        while next_tick_time <= record.time:
+            tick_durations.append(harness.tick())
+            next_tick_time += TICK_INTERVAL
+
+        if speed > 0:
+            delay = start_time + record.time / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        if record.kind == capture.MIDI_RECORD:
+            input_durations.append(harness.send_midi(*record.midi_bytes))
+        elif record.kind == capture.MODE_RECORD:
+            # The replayed session has diverged from the recording,
+            # e.g. because of a behavior change.
+            if record.mode and record.mode != selected_mode(harness):
+                mode_mismatches += 1
+    wall_time = time.perf_counter() - start_time
+
+    results = dict(
+        capture_seconds=records[-1].time if records else 0.0,
+        wall_seconds=wall_time,
+        processing_seconds=sum(input_durations) + sum(tick_durations),
+        input_messages=len(input_durations),
+        output_messages=len(harness.sent_midi),
+        ticks=len(tick_durations),
+        mode_mismatches=mode_mismatches,
+        input_latency=summarize(input_durations),
+        tick_latency=summarize(tick_durations),
+        final_led_state=final_led_state(harness),
+    )
+    harness.disconnect()
+    return results
+
+
+def main():
+    parser = argument_parser("Replay a MIDI capture against the control surface.")
+    parser.add_argument("path", help="capture file to replay")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0.0,
+        help="playback speed relative to the recording, or 0 for maximum speed",
+    )
+    args = parser.parse_args()
+
+    results = run(args.path, args.speed)
+    print(
+        f"{results['input_messages']} messages in, "
+        f"{results['output_messages']} messages out, "
+        f"{results['ticks']} ticks, "
+        f"{results['processing_seconds'] * 1000:.1f}ms processing, "
+        f"{results['wall_seconds']:.2f}s wall time, "
+        f"{results['mode_mismatches']} mode mismatches"
+    )
+    print(f"wrote {write_results('replay', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
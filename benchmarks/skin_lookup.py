@@ -0,0 +1,92 @@
+# Measures redraw throughput of the session matrix (the clip launch
+# buttons in default mode), with the flattened skin and with the
+# framework's skin that it wraps. Clip slots are filled with clips in
+# a mix of states, so that every redraw resolves a variety of colors.
+from __future__ import annotations
+
+import time
+import typing
+
+from harness import Harness, load_script
+
+from . import argument_parser, summarize, write_results
+
+# Cycled over the session's clip slots.
+CLIP_STATES = ("stopped", "playing", "triggered", "recording", "empty")
+
+
+def populate_clip_slots(harness: Harness):
+    from harness import fake_live
+
+    for track_index, track in enumerate(harness.song.tracks):
+        for scene_index, clip_slot in enumerate(track.clip_slots):
+            state = CLIP_STATES[(track_index + scene_index) % len(CLIP_STATES)]
+            if state == "empty":
+                continue
+            clip = fake_live.Clip()
+            clip.is_playing = state == "playing"
+            clip.is_triggered = state == "triggered"
+            clip.is_recording = state == "recording"
+            clip_slot.clip = clip
+            clip_slot.has_clip = True
+            clip_slot.is_triggered = clip.is_triggered
+            clip_slot.is_playing = clip.is_playing
+            clip_slot.is_recording = clip.is_recording
+
+
+def measure(iterations: int, flat: bool) -> typing.Dict[str, typing.Any]:
+    package = load_script()
+    specification = package.Specification
+    flat_skin = specification.control_surface_skin
+    if not flat:
+        specification.control_surface_skin = flat_skin.skin
+
+    try:
+        harness = Harness()
+    finally:
+        specification.control_surface_skin = flat_skin
+
+    harness.identify()
+    populate_clip_slots(harness)
+    harness.tick()
+
+    session = harness.surface.component_map["Session"]
+    durations = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        session.update()
+        durations.append(time.perf_counter() - start_time)
+
+    harness.disconnect()
+
+    result = summarize(durations)
+    result["redraws_per_second"] = len(durations) / sum(durations)
+    return result
+
+
+def run(iterations: int) -> typing.Dict[str, typing.Any]:
+    return {
+        "framework": measure(iterations, flat=False),
+        "flat": measure(iterations, flat=True),
+    }
+
+
+def main():
+    parser = argument_parser(
+        "Measure session matrix redraw throughput with and without the flat skin."
+    )
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for name, result in results.items():
+        print(
+            f"{name:>9}: {result['median_us']:9.1f}us median, "
+            f"{result['p95_us']:9.1f}us p95, "
+            f"{result['redraws_per_second']:9.0f} redraws/s"
+        )
+    print(f"wrote {write_results('skin_lookup', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Reports the startup timings from the control surface's
+# `StartupProfiler`, with and without `lazy_components`, along with
+# which of the lazily-created components exist after startup and the
+# cost of first entering ctrl mode (where they get created).
+#
+# Each configuration is started several times and the timings are
+# averaged. The package is only imported once, so the "imports" phase
+# is only meaningful for the first run.
+from __future__ import annotations
+
+import statistics
+import time
+import typing
+
+from harness import Harness, load_script
+
+from . import argument_parser, write_results
+from .mode_transitions import enter_mode
+
+
+def start(lazy_components: bool) -> typing.Dict[str, typing.Any]:
+    package = load_script()
+    configuration = package._configuration._replace(lazy_components=lazy_components)
+    harness = Harness(configuration=configuration)
+    harness.identify()
+    harness.tick()
+
+    timings = dict(harness.surface.startup_profiler.timings)
+    component_map = harness.surface.component_map
+    created = [
+        name for name in package.mappings.LAZY_COMPONENTS if name in component_map
+    ]
+
+    start_time = time.perf_counter()
+    enter_mode(harness, "ctrl")
+    first_ctrl_time = time.perf_counter() - start_time
+
+    harness.disconnect()
+    return dict(
+        timings=timings,
+        created_at_startup=created,
+        first_ctrl_mode_us=first_ctrl_time * 1e6,
+    )
+
+
+def run(runs: int) -> typing.Dict[str, typing.Any]:
+    results = {}
+    for lazy_components in (False, True):
+        samples = [start(lazy_components) for _ in range(runs)]
+        phases = samples[-1]["timings"].keys()
+        results["lazy" if lazy_components else "eager"] = dict(
+            mean_phase_ms={
+                phase: statistics.fmean(s["timings"][phase] for s in samples) * 1e3
+                for phase in phases
+            },
+            mean_first_ctrl_mode_us=statistics.fmean(
+                s["first_ctrl_mode_us"] for s in samples
+            ),
+            created_at_startup=samples[-1]["created_at_startup"],
+        )
+    return results
+
+
+def main():
+    parser = argument_parser("Report startup timings with and without lazy components.")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    load_script()
+    results = run(args.runs)
+    for name, result in results.items():
+        phases = ", ".join(
+            f"{phase} {ms:.2f}ms" for phase, ms in result["mean_phase_ms"].items()
+        )
+        print(f"{name:>5}: {phases}")
+        print(
+            f"{'':>5}  first ctrl mode {result['mean_first_ctrl_mode_us']:.0f}us, "
+            f"created at startup: {', '.join(result['created_at_startup']) or 'none'}"
+        )
+    print(f"wrote {write_results('startup', results, args.output)}")
+
+    if results["lazy"]["created_at_startup"]:
+        raise SystemExit("lazy components were created at startup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import struct
+import time
+import typing
+
+from .configuration import Configuration
+
+# Capture files start with this header, followed by a sequence of
+# records. Each record starts with a kind byte, the time in seconds
+# since the capture started (little-endian double), and the payload
+# length (little-endian unsigned short), followed by the payload:
+#
+# - MIDI_RECORD: the raw bytes of an incoming MIDI message.
+# - MODE_RECORD: the UTF-8 name of the newly selected main mode.
+# - CONFIGURATION_RECORD: the configuration the capture was recorded
+#   with, as JSON. This is always the first record.
+#
+# A crash can leave an incomplete record at the end of the file, which
+# is ignored when reading.
+CAPTURE_HEADER = b"NK2C\x01"
+
+MIDI_RECORD = 1
+MODE_RECORD = 2
+CONFIGURATION_RECORD = 3
+
+# Maximum time (in seconds) for which records are buffered before
+# being written to disk, so that a crash loses at most this much of
+# the capture.
+FLUSH_INTERVAL = 1.0
+
+_RECORD_PREFIX = struct.Struct("<BdH")
+
+
+class CaptureRecord(typing.NamedTuple):
+    kind: int
+    time: float
+    midi_bytes: typing.Tuple[int, ...] = ()
+    mode: typing.Optional[str] = None
+    configuration: typing.Optional[Configuration] = None
+
+
+# Records incoming MIDI messages and mode changes to a binary file, so
+# that a session can be replayed later (see `benchmarks/replay.py`).
+# Only created when a capture path is set in the configuration.
+#
+# Buffered records are flushed to disk when a record is written or
+# `flush_if_due` is called (e.g. once per scheduler tick), at most
+# once per `FLUSH_INTERVAL`.
+class MidiCapture:
+    def __init__(
+        self,
+        path: str,
+        configuration: Configuration,
+        clock: typing.Callable[[], float] = time.perf_counter,
+    ):
+        self._clock = clock
+        self._start_time = clock()
+        self._file = open(path, "wb")
+        self._file.write(CAPTURE_HEADER)
+
+        self._last_flush_time = self._start_time
+        self._has_unflushed_records = False
+
+        # Control configurations are written as lists of their fields.
+        self._write(
+            CONFIGURATION_RECORD,
+            json.dumps(configuration._asdict()).encode("utf-8"),
+        )
+
+    def record_midi(self, midi_bytes: typing.Sequence[int]):
+        self._write(MIDI_RECORD, bytes(midi_bytes))
+
+    def record_mode(self, mode: typing.Optional[str]):
+        self._write(MODE_RECORD, (mode or "").encode("utf-8"))
+
+    def flush_if_due(self):
+        if not self._has_unflushed_records:
+            return
+        now = self._clock()
+        if now - self._last_flush_time >= FLUSH_INTERVAL:
+            self._file.flush()
+            self._last_flush_time = now
+            self._has_unflushed_records = False
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def _write(self, kind: int, payload: bytes):
+        if self._file.closed:
+            return
+        self._file.write(
+            _RECORD_PREFIX.pack(kind, self._clock() - self._start_time, len(payload))
+        )
+        self._file.write(payload)
+        self._has_unflushed_records = True
+        self.flush_if_due()
+
+
+def read_capture(path: str) -> typing.Iterator[CaptureRecord]:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if not data.startswith(CAPTURE_HEADER):
+        raise ValueError(f"{path} is not a MIDI capture file")
+
+    offset = len(CAPTURE_HEADER)
+    while offset + _RECORD_PREFIX.size <= len(data):
+        kind, record_time, length = _RECORD_PREFIX.unpack_from(data, offset)
+        payload_offset = offset + _RECORD_PREFIX.size
+        offset = payload_offset + length
+        if offset > len(data):
+            break
+        payload = data[payload_offset:offset]
+
+        if kind == MIDI_RECORD:
+            yield CaptureRecord(kind, record_time, midi_bytes=tuple(payload))
+        elif kind == MODE_RECORD:
+            yield CaptureRecord(kind, record_time, mode=payload.decode("utf-8"))
+        elif kind == CONFIGURATION_RECORD:
+            yield CaptureRecord(
+                kind, record_time, configuration=_decode_configuration(payload)
+            )
+        else:
+            raise ValueError(f"unknown record kind {kind} in {path}")
+
+
+# Fields which don't exist in the current `Configuration` (e.g. from a
+# capture recorded by an older version) are dropped, and missing ones
+# get their defaults.
+def _decode_configuration(payload: bytes) -> Configuration:
+    defaults = Configuration()
+    values = {}
+    for field, value in json.loads(payload).items():
+        if field not in Configuration._fields:
+            continue
+        default = getattr(defaults, field)
+        if isinstance(default, list):
+            value = [type(default[0])(*v) for v in value]
+        elif isinstance(default, tuple):
+            value = type(default)(*value)
+        values[field] = value
+    return Configuration(**values)
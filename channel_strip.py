@@ -1,6 +1,6 @@
 import typing
 
-from ableton.v3.base import MultiSlot, listens
+from ableton.v3.base import listens
 from ableton.v3.control_surface.components import (
     ChannelStripComponent as ChannelStripComponentBase,
 )
@@ -8,10 +8,15 @@ from ableton.v3.control_surface.components import (
     MixerComponent as MixerComponentBase,
 )
 from ableton.v3.control_surface.controls import ButtonControl
-from ableton.v3.live import liveobj_changed, liveobj_valid
+from ableton.v3.live import liveobj_changed
 
+from .deferred_updates import DeferredUpdateMixin
+from .meter import PeakMeter
+from .tracing import traced
+from .track_state import TrackState
 
-class ChannelStripComponent(ChannelStripComponentBase):
+
+class ChannelStripComponent(DeferredUpdateMixin, ChannelStripComponentBase):
     # Selects this track, selects the first device in the chain (if
     # any), and momentarily shows the clip view, then switches to
     # device view when released.
@@ -30,28 +35,29 @@ class ChannelStripComponent(ChannelStripComponentBase):
     )
 
     def __init__(self, *a, **k):
-        super().__init__(*a, **k)
-        for view_name in ("Detail", "Detail/DeviceChain"):
-            self.register_slot(
-                MultiSlot(
-                    subject=(self.application.view),
-                    listener=(self._update_clip_view_button),
-                    event_name_list=("is_view_visible",),
-                    extra_args=(view_name,),
-                )
-            )
+        # The base class might assign a track during initialization,
+        # so these need to exist beforehand.
+        self._track_state = TrackState(on_changed=self._on_track_state_changed)
 
-        assert self.song
+        # While the solo button shows the output meter, the solo
+        # button's own colors, to be restored afterwards.
+        self._peak_meter = PeakMeter()
+        self._solo_colors: typing.Optional[typing.Tuple[str, str]] = None
 
-        # This will also fire when tracks are added/removed from the set.
-        self.register_slot(
-            self.song.view, self._update_clip_view_button, "selected_track"
-        )
+        super().__init__(*a, **k)
+        self.register_disconnectable(self._track_state)
+
+        # View state shared by all strips. This is kept current by the
+        # parent mixer, which listens for changes once on behalf of
+        # all of its strips.
+        self._is_device_view_visible = False
+        self._selected_track = None
 
         assert self.__on_track_select_button_is_held_value
         self.__on_track_select_button_is_held_value.subject = self.track_select_button
 
     @clip_view_button.pressed
+    @traced("ChannelStrip.clip_view_button.pressed")
     def clip_view_button(self, _):  # type: ignore
         assert self.song
         if liveobj_changed(self.song.view.selected_track, self._track):
@@ -61,10 +67,12 @@ class ChannelStripComponent(ChannelStripComponentBase):
         self._select_first_device()
 
     @clip_view_button.released
+    @traced("ChannelStrip.clip_view_button.released")
     def clip_view_button(self, _):
         self._show_device_view()
 
     @reset_send_button.pressed
+    @traced("ChannelStrip.reset_send_button.pressed")
     def reset_send_button(self, _):
         # Help out the type checker. In practice this should actually
         # be our own custom MixerComponent, but it doesn't really
@@ -78,7 +86,60 @@ class ChannelStripComponent(ChannelStripComponentBase):
         if send_index < len(sends):
             sends[send_index].value = 0
 
+    def set_track(self, track):
+        # Refresh the mirrored state first, since the base
+        # implementation updates the component.
+        self._track_state.set_track(track, self.song)
+        super().set_track(track)
+
+        # Don't carry a held peak over to a different track, e.g. when
+        # the session ring scrolls.
+        self._peak_meter.reset()
+        if self._solo_colors is not None:
+            self._set_solo_button_color("Meter.Off")
+
+    # Called by the parent mixer whenever the device view visibility
+    # or the selected track changes.
+    def set_view_state(self, is_device_view_visible, selected_track):
+        self._is_device_view_visible = is_device_view_visible
+        self._selected_track = selected_track
+        self._update_clip_view_button()
+
+    # Show the track's output meter on the solo button instead of the
+    # solo state. Presses are still handled by the solo button, so
+    # they toggle solo as usual.
+    def set_solo_meter_enabled(self, enabled: bool):
+        if enabled and self._solo_colors is None:
+            self._solo_colors = (
+                self.solo_button.toggled_color,
+                self.solo_button.untoggled_color,
+            )
+            self._peak_meter.reset()
+            self._set_solo_button_color("Meter.Off")
+        elif not enabled and self._solo_colors is not None:
+            toggled_color, untoggled_color = self._solo_colors
+            self._solo_colors = None
+            self.solo_button.toggled_color = toggled_color
+            self.solo_button.untoggled_color = untoggled_color
+
+    # Called by the parent mixer once per tick while the meter is
+    # shown.
+    def sample_meter(self, threshold: float):
+        track = self._track
+        level = (
+            track.output_meter_level
+            if self._track_state.is_valid and track.has_audio_output
+            else 0.0
+        )
+        if self._peak_meter.sample(level, threshold):
+            self._set_solo_button_color(
+                "Meter.Peak" if self._peak_meter.is_lit else "Meter.Off"
+            )
+
     def update(self):
+        if self._defer_update():
+            return
+
         super().update()
         self._update_clip_view_button()
         self._update_reset_send_button()
@@ -97,13 +158,17 @@ class ChannelStripComponent(ChannelStripComponentBase):
     def _show_device_view(self):
         self.application.view.show_view("Detail/DeviceChain")
 
+    # Both colors are set, so that the meter is shown regardless of
+    # the solo state.
+    def _set_solo_button_color(self, color: str):
+        self.solo_button.toggled_color = color
+        self.solo_button.untoggled_color = color
+
     def _toggle_track_folded(self):
         if self._track and self._track.is_foldable:
             self._track.fold_state = not self._track.fold_state
 
     def _update_clip_view_button(self):
-        assert self.song
-
         has_clip_slots = self._has_clip_slots()
         self.clip_view_button.enabled = has_clip_slots
 
@@ -113,31 +178,30 @@ class ChannelStripComponent(ChannelStripComponentBase):
             # visible, light the selected track, otherwise don't light
             # anything.
             self.clip_view_button.is_on = (
-                self.application.view.is_view_visible("Detail")
-                and self.application.view.is_view_visible("Detail/DeviceChain")
-                and not liveobj_changed(self.song.view.selected_track, self._track)
+                self._is_device_view_visible
+                and not liveobj_changed(self._selected_track, self._track)
             )
 
     def _update_reset_send_button(self):
         self.reset_send_button.enabled = self._has_sends()
 
+    def _on_track_state_changed(self):
+        self._update_clip_view_button()
+        self._update_reset_send_button()
+
     def _has_sends(self):
+        track_state = self._track_state
         return (
-            liveobj_valid(self._track)
-            and self.song
-            and self._track
-            and self._track != self.song.master_track
-            and len(self._track.mixer_device.sends) > 0
+            track_state.is_valid
+            and not track_state.is_master
+            and track_state.num_sends > 0
         )
 
     def _has_clip_slots(self):
-        return (
-            self._track
-            and liveobj_valid(self._track)
-            and len(self._track.clip_slots) > 0
-        )
+        return self._track_state.is_valid and self._track_state.num_clip_slots > 0
 
     @listens("is_held")
+    @traced("ChannelStrip.on_track_select_button_is_held")
     def __on_track_select_button_is_held_value(self, is_held):
         if is_held:
             self._toggle_track_folded()
@@ -1,128 +1,407 @@
 from __future__ import annotations
 
+import typing
+
+from ableton.v3.base import depends, task
 from ableton.v3.control_surface.colors import BasicColors
 from ableton.v3.control_surface.elements import Color
 
+# Extra time to wait past a step boundary when blinking is synced to
+# the song, so that the song position has actually crossed the
+# boundary when the blink task wakes up.
+SYNC_WAIT_MARGIN = 0.005
+
+
+# An on/off sequence for blinking LEDs, with one step per tick. For
+# example, `BlinkPattern(0, 1, 1, 1)` gives a short OFF and a long ON
+# period, and `BlinkPattern(1, 0, 1, 0, 0, 0, 0, 0)` gives a double
+# pulse. The pattern repeats within the cycle of its `BlinkManager`,
+# so its length must divide the cycle length.
+class BlinkPattern:
+    def __init__(self, *steps: int):
+        assert len(steps) > 0
+        self._steps = tuple(bool(step) for step in steps)
+
+    @property
+    def steps(self) -> typing.Tuple[bool, ...]:
+        return self._steps
+
+    def __repr__(self):
+        return f"BlinkPattern{tuple(int(step) for step in self._steps)}"
+
+
+# Listener for inactive value generators.
+def _ignore_value(_value: int):
+    pass
+
 
 # Keeps track of the current position within a cycle of some number of
 # ticks, and provides objects to generate on/off LED values which are
 # synchronized with the cycle. This is used to synchronize the timing
 # of blinking LEDs, so that the controller doesn't look too wacky when
 # multiple buttons are blinking.
+#
+# Each pattern is compiled once into a table of LED values indexed by
+# cycle position. The manager owns a single task which advances the
+# cycle once per tick, does one table lookup per pattern, and only
+# notifies the value generators whose value actually changes on that
+# tick. The task is started when the first value generator is created,
+# and killed when the last one is disconnected.
+#
+# By default, the cycle advances once per 100ms scheduler tick. With
+# `start_tempo_sync`, the cycle position is instead derived from the
+# song's beat position while the song is playing, so that blinking
+# stays in time with the music. In that case the task sleeps until the
+# next step boundary rather than waking up on every tick, and is only
+# rescheduled when the tempo or play state changes.
 class BlinkManager:
+    # Value generators are pooled, and reused after being
+    # disconnected. Holders must drop their reference on disconnect.
     class ValueGenerator:
-        def __init__(
-            self, parent: BlinkManager, ticks_per_toggle: int, cycle_position: int
-        ):
+        __slots__ = ("_parent", "_group", "_listener")
+
+        def __init__(self, parent: BlinkManager):
             self._parent = parent
-            self._ticks_per_toggle = ticks_per_toggle
-            self._cycle_position = cycle_position
 
-        @property
-        def ticks_per_toggle(self):
-            return self._ticks_per_toggle
+            # The group for the blink pattern, or None if inactive.
+            self._group: typing.Optional[BlinkManager._Group] = None
+            self._listener: typing.Callable[[int], typing.Any] = _ignore_value
 
-        # This is expected to be called once on every tick while the blink is active.
-        def on_tick(self):
-            self._cycle_position = (self._cycle_position + 1) % self._parent.cycle_ticks
-            self._parent._set_cycle_position(self._cycle_position)
+        @property
+        def pattern(self) -> BlinkPattern:
+            assert self._group
+            return self._group.pattern
 
-        # Get the value that should be sent to the button on the
-        # current tick. This should be accessed after `on_tick` is
-        # called for a given tick.
+        # Get the value that should be sent to the button at the
+        # current cycle position.
         @property
         def value(self) -> int:
-            toggle_cycle_ticks = self._ticks_per_toggle * 2
+            assert self._group
+            return self._group.table[self._parent.cycle_position]
 
-            # Move the local cycle position in reverse, to allow for a short initial OFF value followed by
-            toggle_cycle_position = (
-                self._cycle_position
-                # self._parent.cycle_ticks - self._cycle_position
-            ) % toggle_cycle_ticks
+        def disconnect(self):
+            self._parent._value_generator_disconnected(self)
 
-            # Initially lit, then turned off for the second half of the cycle.
-            return 127 if toggle_cycle_position < self._ticks_per_toggle else 0
+    # Active value generators for a blink pattern, along with the
+    # pattern's compiled value table. Groups are kept for the lifetime
+    # of the manager once created.
+    class _Group:
+        __slots__ = ("pattern", "table", "members", "snapshot")
 
-        def disconnect(self):
-            self._parent._value_generator_disconnected()
+        def __init__(self, pattern: BlinkPattern, table: typing.Tuple[int, ...]):
+            self.pattern = pattern
+            self.table = table
+
+            # Dict used as an insertion-ordered set.
+            self.members: typing.Dict[BlinkManager.ValueGenerator, None] = {}
+
+            # Tuple of `members`, rebuilt on the next tick after
+            # membership changes, so that ticks don't need to copy.
+            self.snapshot: typing.Tuple[BlinkManager.ValueGenerator, ...] = ()
 
     def __init__(self, cycle_ticks: int):
         self._cycle_ticks = cycle_ticks
         self._cycle_position = 0
         self._num_active_value_generators = 0
 
+        # Groups by pattern, and a tuple of all groups for iteration
+        # during ticks.
+        self._groups: typing.Dict[BlinkPattern, BlinkManager._Group] = {}
+        self._groups_snapshot: typing.Tuple[BlinkManager._Group, ...] = ()
+
+        # Groups whose members have changed since the last tick.
+        self._stale_groups: typing.Set[BlinkManager._Group] = set()
+
+        # Disconnected value generators, available for reuse.
+        self._free_value_generators: typing.List[BlinkManager.ValueGenerator] = []
+
+        # Value generators which haven't received a tick yet. These
+        # get notified on the next tick even if their group's value
+        # doesn't change, since the button might currently be showing
+        # some other value.
+        self._pending_value_generators: typing.Dict[
+            BlinkManager.ValueGenerator, None
+        ] = {}
+
+        self._tick_task: typing.Union[None, task.Task] = None
+
+        # The song and number of cycle steps per beat, if synced to
+        # the song's tempo.
+        self._song: typing.Any = None
+        self._steps_per_beat = 0
+
+        # Step (in song time) of the last sync, used to detect jumps
+        # in the song position.
+        self._synced_step = 0
+
     @property
     def cycle_ticks(self) -> int:
         return self._cycle_ticks
 
-    def get_value_generator(self, ticks_per_toggle: int):
-        if self._num_active_value_generators == 0:
+    @property
+    def is_tempo_synced(self) -> bool:
+        return self._song is not None and self._song.is_playing
+
+    @property
+    def cycle_position(self) -> int:
+        return self._cycle_position
+
+    def start_tempo_sync(self, song, steps_per_beat: int):
+        """
+        Derive the cycle position from the song's beat position while the song is
+        playing. Blinking falls back to the scheduler tick while it's stopped.
+
+        :param steps_per_beat: number of cycle steps (i.e. blink pattern steps) per
+                               beat.
+        """
+        assert steps_per_beat > 0
+        self.stop_tempo_sync()
+
+        self._song = song
+        self._steps_per_beat = steps_per_beat
+        song.add_tempo_listener(self._on_song_timing_changed)
+        song.add_is_playing_listener(self._on_song_timing_changed)
+        song.add_current_song_time_listener(self._on_song_time_changed)
+        self._on_song_timing_changed()
+
+    def stop_tempo_sync(self):
+        if self._song is not None:
+            self._remove_song_listeners()
+            self._on_song_timing_changed()
+
+    # Stop syncing and ticking, e.g. when the control surface
+    # disconnects. Unlike `stop_tempo_sync`, this doesn't restart the
+    # tick task, since the task group is going away.
+    def disconnect(self):
+        if self._song is not None:
+            self._remove_song_listeners()
+        self._stop_tick_task()
+
+    def get_value_generator(
+        self, pattern: BlinkPattern, listener: typing.Callable[[int], typing.Any]
+    ):
+        """
+        :param listener: invoked with the new LED value whenever the value for
+                         this generator changes.
+        """
+        group = self._get_group(pattern)
+        table = group.table
+
+        if self._num_active_value_generators == 0 and not self.is_tempo_synced:
             # UX hack - if there are no other buttons currently
-            # blinking, advance the cycle position to start in the OFF
-            # state, for better visual feedback in the typical case
-            # when the button is already lit.
-            #
-            # As opposed to just starting with the OFF state in the
-            # `ValueGenerator`, this allows us to use the cycle length
-            # to display OFF for a short number of ticks, then ON for
-            # a longer number of ticks (e.g. if the cycle length is 4
-            # and our `ticks_per_toggle` is 3).
-            #
-            # We could make `ticks_per_toggle` an array if we ever
-            # need more flexibility here.
-            self._cycle_position = ticks_per_toggle - 1
+            # blinking, move the cycle position so that the next tick
+            # shows the pattern's first OFF step, for better visual
+            # feedback in the typical case when the button is already
+            # lit.
+            if 0 in table:
+                self._cycle_position = (table.index(0) - 1) % self._cycle_ticks
 
         self._num_active_value_generators += 1
-        return BlinkManager.ValueGenerator(
-            parent=self,
-            ticks_per_toggle=ticks_per_toggle,
-            cycle_position=self._cycle_position,
+        value_generator = (
+            self._free_value_generators.pop()
+            if self._free_value_generators
+            else BlinkManager.ValueGenerator(self)
         )
-
-    def _value_generator_disconnected(self):
+        value_generator._group = group
+        value_generator._listener = listener
+        group.members[value_generator] = None
+        self._stale_groups.add(group)
+        self._pending_value_generators[value_generator] = None
+
+        if self._tick_task is None:
+            self._start_tick_task()
+
+        return value_generator
+
+    # Get the group for a pattern, compiling the pattern into a value
+    # table the first time it's used.
+    def _get_group(self, pattern: BlinkPattern) -> _Group:
+        group = self._groups.get(pattern)
+        if group is None:
+            steps = pattern.steps
+            assert self._cycle_ticks % len(steps) == 0
+            table = tuple(
+                127 if steps[position % len(steps)] else 0
+                for position in range(self._cycle_ticks)
+            )
+            group = BlinkManager._Group(pattern, table)
+            self._groups[pattern] = group
+            self._groups_snapshot = tuple(self._groups.values())
+        return group
+
+    def _value_generator_disconnected(self, value_generator: ValueGenerator):
         # This method shouldn't be called except by a currently-active value generator.
+        group = value_generator._group
+        assert group is not None
         self._num_active_value_generators -= 1
         assert self._num_active_value_generators >= 0
 
-        # Reset the cycle position when nothing is blinking.
+        del group.members[value_generator]
+        self._stale_groups.add(group)
+        self._pending_value_generators.pop(value_generator, None)
+
+        value_generator._group = None
+        value_generator._listener = _ignore_value
+        self._free_value_generators.append(value_generator)
+
+        # Reset the cycle position and stop ticking when nothing is
+        # blinking.
         if self._num_active_value_generators == 0:
             self._cycle_position = 0
+            self._stop_tick_task()
+
+    # The task group is only available while a control surface is
+    # active, so it's looked up whenever blinking starts rather than
+    # when the manager is created.
+    @depends(parent_task_group=None)
+    def _start_tick_task(self, parent_task_group=None):
+        assert parent_task_group
+        if self.is_tempo_synced:
+            self._tick_task = parent_task_group.add(task.run(self._on_beat_step))
+        else:
+            self._tick_task = parent_task_group.add(task.loop(task.run(self._on_tick)))
+
+    def _stop_tick_task(self):
+        if self._tick_task is not None:
+            self._tick_task.kill()
+            self._tick_task = None
+
+    # Restart the task with the new timing. This is a no-op if nothing
+    # is blinking.
+    def _on_song_timing_changed(self):
+        if self._tick_task is not None:
+            self._stop_tick_task()
+            self._start_tick_task()
+
+    # Resync right away if the song position jumps (e.g. when seeking)
+    # rather than at the next scheduled step. This fires continuously
+    # during playback, so it only compares the position against the
+    # last synced step, which is expected to be the current or
+    # previous step.
+    def _on_song_time_changed(self):
+        if self._tick_task is None or not self.is_tempo_synced:
+            return
+        step = int(self._song.current_song_time * self._steps_per_beat)
+        if step != self._synced_step and step != self._synced_step + 1:
+            self._on_song_timing_changed()
+
+    def _remove_song_listeners(self):
+        self._song.remove_tempo_listener(self._on_song_timing_changed)
+        self._song.remove_is_playing_listener(self._on_song_timing_changed)
+        self._song.remove_current_song_time_listener(self._on_song_time_changed)
+        self._song = None
+
+    def _on_tick(self):
+        self._set_cycle_position((self._cycle_position + 1) % self._cycle_ticks)
+
+    # Sync the cycle position to the song, and sleep until the next
+    # step boundary.
+    @depends(parent_task_group=None)
+    def _on_beat_step(self, parent_task_group=None):
+        assert parent_task_group
+        assert self._song is not None
+        steps = self._song.current_song_time * self._steps_per_beat
+        step = int(steps)
+        self._synced_step = step
+        self._set_cycle_position(step % self._cycle_ticks)
+
+        # Listeners might have stopped all blinking.
+        if self._tick_task is None:
+            return
+
+        seconds_per_step = 60.0 / (self._song.tempo * self._steps_per_beat)
+        self._tick_task = parent_task_group.add(
+            task.sequence(
+                task.wait((step + 1 - steps) * seconds_per_step + SYNC_WAIT_MARGIN),
+                task.run(self._on_beat_step),
+            )
+        )
 
-    # Called by all active value generators on every tick. The value
-    # generators should always all be at the same cycle position, so
-    # repeated calls on the same tick will just be a no-op.
+    # This runs on every tick while anything is blinking, so it avoids
+    # allocating anything in the steady state: groups and their
+    # members are iterated by index over cached tuple snapshots, since
+    # a `for` loop would allocate an iterator for each of them.
     def _set_cycle_position(self, cycle_position: int):
+        previous_cycle_position = self._cycle_position
         self._cycle_position = cycle_position
 
+        if self._stale_groups:
+            for group in self._stale_groups:
+                group.snapshot = tuple(group.members)
+            self._stale_groups.clear()
+
+        # Listeners may start or stop blinking in response to a value
+        # change. New value generators get picked up on the next tick.
+        pending_value_generators = self._pending_value_generators
+        if pending_value_generators:
+            self._pending_value_generators = {}
+        else:
+            pending_value_generators = None
+
+        groups = self._groups_snapshot
+        group_index = 0
+        while group_index < len(groups):
+            group = groups[group_index]
+            group_index += 1
+
+            table = group.table
+            value = table[cycle_position]
+            if value == table[previous_cycle_position]:
+                continue
+
+            members = group.snapshot
+            member_index = 0
+            while member_index < len(members):
+                value_generator = members[member_index]
+                member_index += 1
+
+                # Skip value generators which were disconnected (or
+                # reused for another pattern) by an earlier listener.
+                if value_generator._group is group:
+                    if pending_value_generators is not None:
+                        pending_value_generators.pop(value_generator, None)
+                    value_generator._listener(value)
+
+        if pending_value_generators is not None:
+            for value_generator in pending_value_generators:
+                group = value_generator._group
+                if group is not None:
+                    value_generator._listener(group.table[cycle_position])
+
 
 # A color which interacts with our custom `BlinkingButtonElement` to
 # send blinking effects.
 class BlinkingColor(Color):
-    def __init__(self, ticks: int, blink_manager: BlinkManager, *a, **k):
+    def __init__(self, pattern: BlinkPattern, *a, **k):
         """
-        :param int ticks: the number of task ticks (one per 100ms) comprising a single ON
-                          or OFF period for the button. In practice, the number of ticks
-                          during which a given state is shown will also depend on the cycle
-                          length of the associated `BlinkManager`.
+        :param BlinkPattern pattern: the on/off sequence shown by the button, with one
+                                     step per task tick (one per 100ms), or per
+                                     subdivision of the beat if the blink manager is
+                                     synced to the song.
         """
         super().__init__(*a, **k)
 
-        self._ticks = ticks
-        self._blink_manager = blink_manager
+        self._pattern = pattern
 
     @property
-    def ticks(self):
-        return self._ticks
+    def pattern(self):
+        return self._pattern
 
     def draw(self, interface):
         # Any button to which this color is assigned must implement
-        # our custom `BlinkingButtonElement` interface.
-        interface.send_blink(self.ticks, self._blink_manager)
+        # our custom `BlinkingButtonElement` interface, which blinks
+        # via its control surface's blink manager.
+        interface.send_blink(self.pattern)
+
+
+# Length of the blink cycle, in steps. Patterns must evenly divide it.
+BLINK_CYCLE_TICKS = 8
 
+# Mostly ON, with a short OFF period.
+BLINK = BlinkingColor(BlinkPattern(1, 1, 1, 1, 1, 1, 0, 0))
 
-_blink_manager = BlinkManager(8)
-BLINK = BlinkingColor(6, _blink_manager)
-BLINK_FAST = BlinkingColor(2, _blink_manager)
+# Alternating ON and OFF, two ticks each.
+BLINK_FAST = BlinkingColor(BlinkPattern(1, 1, 0, 0))
 
 
 class Skin:
@@ -159,3 +438,54 @@ class Skin:
 
     class Transport:
         StopOn = BasicColors.OFF
+
+    class Meter:
+        Peak = BasicColors.ON
+        Off = BasicColors.OFF
+
+
+# Resolves color names (e.g. "Session.ClipPlaying") with a single dict
+# lookup. Names defined in `skin_class` are resolved through the
+# wrapped skin once, up front. Any other names (e.g. from the
+# framework's default skin, like "DefaultButton.Off") are resolved
+# through the wrapped skin on first use and memoized.
+class FlatSkin:
+    def __init__(self, skin, skin_class: type):
+        self._skin = skin
+        self._colors: typing.Dict[str, typing.Any] = {
+            name: skin[name] for name in self._color_names(skin_class)
+        }
+
+    @property
+    def skin(self):
+        return self._skin
+
+    def __getitem__(self, name: str):
+        try:
+            return self._colors[name]
+        except KeyError:
+            # Missing names raise from the wrapped skin, and aren't
+            # memoized.
+            color = self._skin[name]
+            self._colors[name] = color
+            return color
+
+    # Delegate anything else (e.g. attributes used by the framework)
+    # to the wrapped skin.
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._skin, name)
+
+    # Dotted names of all colors defined in a skin class, including
+    # inherited ones.
+    @staticmethod
+    def _color_names(skin_class: type, prefix: str = "") -> typing.Iterator[str]:
+        for key in dir(skin_class):
+            if key.startswith("_"):
+                continue
+            value = getattr(skin_class, key)
+            if isinstance(value, type):
+                yield from FlatSkin._color_names(value, f"{prefix}{key}.")
+            else:
+                yield f"{prefix}{key}"
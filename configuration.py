@@ -34,6 +34,13 @@ class EncoderConfiguration(typing.NamedTuple):
     channel: int
     map_mode: int
 
+    # Minimum change (in raw MIDI values, i.e. 0-127 for CC or
+    # 0-16383 for pitch bend) for an absolute value to be passed on to
+    # Live, unless it continues an ongoing movement. This filters out
+    # jitter from pots at rest. Setting a dead band means values are
+    # handled by the script rather than mapped directly by Live.
+    dead_band: int = 0
+
 
 def cc_button(identifier, channel=DEFAULT_CHANNEL):
     return ButtonConfiguration(
@@ -41,9 +48,15 @@ def cc_button(identifier, channel=DEFAULT_CHANNEL):
     )
 
 
-def cc_encoder(identifier, channel=DEFAULT_CHANNEL, map_mode=MAP_MODES.absolute):
+def cc_encoder(
+    identifier, channel=DEFAULT_CHANNEL, map_mode=MAP_MODES.absolute, dead_band=0
+):
     return EncoderConfiguration(
-        identifier=identifier, msg_type=MIDI_CC_TYPE, channel=channel, map_mode=map_mode
+        identifier=identifier,
+        msg_type=MIDI_CC_TYPE,
+        channel=channel,
+        map_mode=map_mode,
+        dead_band=dead_band,
     )
 
 
@@ -53,12 +66,13 @@ def note_button(identifier, channel=DEFAULT_CHANNEL):
     )
 
 
-def pb_encoder(channel=DEFAULT_CHANNEL):
+def pb_encoder(channel=DEFAULT_CHANNEL, dead_band=0):
     return EncoderConfiguration(
         identifier=0,
         msg_type=MIDI_PB_TYPE,
         channel=channel,
         map_mode=MAP_MODES.absolute,
+        dead_band=dead_band,
     )
 
 
@@ -112,6 +126,97 @@ class Configuration(typing.NamedTuple):
     # ctrl.
     initial_mode: str = "default"
 
+    # Number of device parameter bank layouts (per device type,
+    # parameter list and bank) to remember, so that scrolling back to
+    # a kind of device that's already been seen doesn't resolve its
+    # banks again. Set to 0 to disable the cache.
+    bank_layout_cache_size: int = 64
+
+    # Number of scheduler ticks (100ms each) over which slider and
+    # knob input is coalesced before being written to Live. Only the
+    # most recent value for each control is written at the end of the
+    # window, which can reduce load in Live when moving many faders
+    # at once. With the default of 0, controls are mapped directly
+    # by Live and every message is applied.
+    encoder_coalescing_ticks: int = 0
+
+    # Maximum average number of LED messages sent to the device per
+    # millisecond, e.g. 0.5. When many LEDs change at once, messages
+    # beyond the budget are delayed (keeping only the newest value for
+    # each LED), with mode buttons and just-pressed buttons sent first.
+    # With the default of 0, output isn't rate limited.
+    midi_output_messages_per_ms: float = 0.0
+
+    # Count MIDI traffic per element, per mode and per second. A
+    # snapshot is logged when the control surface is disconnected, and
+    # can be requested with `NK2Reshift.log_midi_traffic` or
+    # `NK2Reshift.write_midi_traffic`.
+    midi_instrumentation: bool = False
+
+    # Number of blink steps per beat when the song is playing, e.g. 4
+    # to advance blink patterns once per 16th note. This keeps
+    # blinking LEDs (e.g. for playing or triggered clips) in time with
+    # the music. With the default of 0, or while the song is stopped,
+    # blink patterns advance once per scheduler tick (100ms).
+    blink_steps_per_beat: int = 0
+
+    # In shift mode, light each track's solo button while the track's
+    # output is near its peak, instead of showing its solo state.
+    # Pressing the buttons still toggles solo. Peaks are held briefly
+    # and then decay. The threshold is an output meter level between 0
+    # and 1, and changes to it are applied by
+    # `NK2Reshift.reload_configuration`.
+    solo_meters: bool = False
+    solo_meter_threshold: float = 0.85
+
+    # Check `user.py` for changes once per second, and apply changed
+    # control mappings without reloading the control surface (see
+    # `NK2Reshift.reload_configuration`). Other changes, or changes to
+    # a control's message type or map mode, still require the control
+    # surface to be reloaded in Live.
+    watch_user_configuration: bool = False
+
+    # Create the components which are only used in ctrl mode (device
+    # control, device navigation and arrangement recording) when ctrl
+    # mode is first entered, rather than at startup. This reduces the
+    # script's contribution to Live's launch time.
+    lazy_components: bool = False
+
+    # Path of a file to which all incoming MIDI (with timestamps and
+    # mode changes) is recorded, e.g. to replay a session later with
+    # `benchmarks/replay.py`. Relative paths are relative to this
+    # directory. The file is overwritten whenever the control surface
+    # is loaded, and written to disk at least once per second. The
+    # configuration itself is recorded at the start, so that replays
+    # run with the same settings.
+    #
+    # While capturing, slider and knob input is forwarded to the
+    # script (and written to Live by the script) rather than being
+    # mapped by Live directly, since Live's direct mappings bypass the
+    # script and wouldn't be captured.
+    midi_capture_path: typing.Optional[str] = None
+
+    # Record the latency of the button handlers and listeners defined
+    # in the script's own components: the channel strip, mixer,
+    # transport and track state. Handlers inherited from the
+    # framework aren't traced. Percentiles per handler are logged when
+    # the control surface is disconnected, and can be requested with
+    # `NK2Reshift.log_handler_latencies` or
+    # `NK2Reshift.write_handler_latencies`.
+    handler_tracing: bool = False
+
+    # Path of a file to which the script's log messages are written,
+    # instead of Live's Log.txt. Relative paths are relative to this
+    # directory. Messages are kept in an in-memory ring buffer, and
+    # written in batches by a background thread, so logging doesn't
+    # block MIDI handling. When an error is logged, the ring buffer is
+    # written to `<log_path>.dump`.
+    log_path: typing.Optional[str] = None
+
+    # Also log debug messages, if `log_path` is set. Debug messages
+    # are only kept in memory, and included in error dumps.
+    debug_logging: bool = False
+
 
 # To use the original NanoKontrol2Shift configuration, do something
 # like the following in `user.py`:
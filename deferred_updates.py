@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import typing
+from contextlib import contextmanager
+
+from ableton.v3.base import depends
+
+
+# Collects component updates requested while handling an input event
+# or a scheduler tick, and runs each of them once at the end. This
+# avoids redundant work when e.g. a mode change sets several control
+# groups on the same component, each of which would otherwise trigger
+# a full update.
+class DeferredUpdates:
+    def __init__(self):
+        # Dict used as an insertion-ordered set.
+        self._dirty_components: typing.Dict[DeferredUpdateMixin, None] = {}
+        self._depth = 0
+
+    @contextmanager
+    def deferring(self):
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.flush()
+
+    # Returns whether the update was deferred. If not, the caller
+    # should update immediately.
+    def defer(self, component: DeferredUpdateMixin) -> bool:
+        if self._depth > 0:
+            self._dirty_components[component] = None
+            return True
+        return False
+
+    def flush(self):
+        dirty_components = self._dirty_components
+        self._dirty_components = {}
+        for component in dirty_components:
+            component.update()
+
+    # Run pending updates right away, even inside a frame, e.g. so that
+    # they happen within some other context. Any updates requested
+    # meanwhile also run immediately.
+    def flush_now(self):
+        depth = self._depth
+        self._depth = 0
+        try:
+            self.flush()
+        finally:
+            self._depth = depth
+
+
+# Mixin for components whose updates should be deferred while a
+# `DeferredUpdates` frame is open.
+class DeferredUpdateMixin:
+    @depends(deferred_updates=None)
+    def __init__(
+        self, *a, deferred_updates: typing.Optional[DeferredUpdates] = None, **k
+    ):
+        # The base class might update during initialization.
+        self._deferred_updates = deferred_updates
+        super().__init__(*a, **k)
+
+    def update(self):
+        if not self._defer_update():
+            super().update()  # type: ignore
+
+    # Mark this component as needing an update, if updates are
+    # currently being deferred. Subclasses which override `update`
+    # should return immediately if this returns `True`.
+    def _defer_update(self) -> bool:
+        deferred_updates = self._deferred_updates
+        return deferred_updates is not None and deferred_updates.defer(self)
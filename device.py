@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import collections
+import copy
+import typing
+
+from ableton.v3.base import depends
+from ableton.v3.control_surface.components import (
+    DeviceComponent as DeviceComponentBase,
+)
+from ableton.v3.live import liveobj_valid
+
+from .configuration import Configuration
+
+# Class names of devices whose parameter lists depend on the loaded
+# plugin or Max patch rather than on the class, and which therefore
+# aren't cached.
+UNCACHED_CLASS_NAMES = frozenset(
+    (
+        "AuPluginDevice",
+        "PluginDevice",
+        "MxDeviceAudioEffect",
+        "MxDeviceInstrument",
+        "MxDeviceMidiEffect",
+    )
+)
+
+# (device class name, original names of the device's parameters, bank
+# index)
+BankLayoutKey = typing.Tuple[str, typing.Tuple[str, ...], int]
+
+# For each slot in a bank: the index of its parameter in the device's
+# parameter list (or None for an empty slot), the framework's
+# parameter info for the slot (used as a template), and the slot's
+# name if the bank definition gives it one (rather than using the
+# parameter's own name).
+BankLayout = typing.Tuple[
+    typing.Tuple[typing.Optional[int], typing.Any, typing.Optional[str]], ...
+]
+
+
+# Least-recently-used cache of resolved bank layouts. Built-in devices
+# of the same class with the same parameters always resolve to the
+# same layout, so a layout only needs to be computed the first time a
+# given kind of device is seen.
+class BankLayoutCache:
+    def __init__(self, max_size: int):
+        assert max_size > 0
+        self._max_size = max_size
+        self._layouts: typing.OrderedDict[
+            BankLayoutKey, BankLayout
+        ] = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._layouts)
+
+    def get(self, key: BankLayoutKey) -> typing.Optional[BankLayout]:
+        layout = self._layouts.get(key)
+        if layout is not None:
+            self._layouts.move_to_end(key)
+        return layout
+
+    def put(self, key: BankLayoutKey, layout: BankLayout):
+        self._layouts[key] = layout
+        self._layouts.move_to_end(key)
+        while len(self._layouts) > self._max_size:
+            self._layouts.popitem(last=False)
+
+
+# Device component which reuses bank layouts for devices it has
+# already seen, e.g. when scrolling through a device chain with the
+# marker buttons in ctrl mode, rather than resolving the bank
+# definitions for every device.
+#
+# Racks, plugins and Max devices aren't cached, since their banks
+# depend on more than the device class.
+#
+# This hooks into the framework's private `_get_provided_parameters`
+# and `_bank`. Only the bank's parameter resolution is cached; the
+# bank itself is still set up by the framework. If the bank (or its
+# index) isn't available, the framework's own resolution is used, and
+# if the hook is renamed, the cache is simply bypassed.
+class DeviceComponent(DeviceComponentBase):
+    @depends(configuration=None)
+    def __init__(self, *a, configuration: typing.Optional[Configuration] = None, **k):
+        super().__init__(*a, **k)
+        assert configuration
+        self._bank_layouts: typing.Optional[BankLayoutCache] = (
+            BankLayoutCache(configuration.bank_layout_cache_size)
+            if configuration.bank_layout_cache_size > 0
+            else None
+        )
+
+    def _get_provided_parameters(self):
+        device = self.device
+        bank_index = getattr(getattr(self, "_bank", None), "index", None)
+        if (
+            self._bank_layouts is None
+            or bank_index is None
+            or not liveobj_valid(device)
+            or device.can_have_chains
+            or device.class_name in UNCACHED_CLASS_NAMES
+        ):
+            return super()._get_provided_parameters()
+
+        parameters = list(device.parameters)
+        names = tuple(parameter.original_name for parameter in parameters)
+        key: BankLayoutKey = (device.class_name, names, bank_index)
+
+        layout = self._bank_layouts.get(key)
+        if layout is None:
+            parameter_infos = super()._get_provided_parameters()
+            layout = self._create_layout(parameters, names, parameter_infos)
+            self._bank_layouts.put(key, layout)
+            return parameter_infos
+
+        return [self._create_parameter_info(parameters, slot) for slot in layout]
+
+    # Live objects are compared by equality rather than hashed, since
+    # the same parameter can be represented by different wrappers, so
+    # parameters are looked up by name and then checked.
+    @staticmethod
+    def _create_layout(parameters, names, parameter_infos) -> BankLayout:
+        indices_by_name: typing.Dict[str, int] = {}
+        for index, name in enumerate(names):
+            indices_by_name.setdefault(name, index)
+
+        layout = []
+        for info in parameter_infos:
+            if liveobj_valid(info.parameter):
+                index = indices_by_name.get(info.parameter.original_name)
+                if index is None or parameters[index] != info.parameter:
+                    # e.g. one of several parameters with the same name.
+                    index = parameters.index(info.parameter)
+                custom_name = info.name if info.name != info.parameter.name else None
+            else:
+                index = None
+                custom_name = None
+            layout.append((index, info, custom_name))
+        return tuple(layout)
+
+    # Fill in a copy of the template with the current device's
+    # parameter, and anything else which comes from the parameter
+    # rather than from the bank definition.
+    @staticmethod
+    def _create_parameter_info(parameters, slot):
+        index, template, custom_name = slot
+        parameter_info = copy.copy(template)
+        if index is None:
+            parameter_info.parameter = None
+        else:
+            parameter = parameters[index]
+            parameter_info.parameter = parameter
+            parameter_info.name = (
+                custom_name if custom_name is not None else parameter.name
+            )
+        return parameter_info
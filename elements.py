@@ -1,102 +1,423 @@
 from __future__ import annotations
 
+import time
 import typing
 
-from ableton.v3.base import depends, task
-from ableton.v3.control_surface import ElementsBase
-from ableton.v3.control_surface.elements import ButtonElement
+from ableton.v3.base import depends, listens
+from ableton.v3.control_surface import (
+    MIDI_CC_TYPE,
+    MIDI_NOTE_TYPE,
+    MIDI_PB_TYPE,
+    ElementsBase,
+)
+from ableton.v3.control_surface.elements import ButtonElement, EncoderElement
+from ableton.v3.live import liveobj_valid
 
-from .colors import BlinkManager
+from .colors import BLINK_CYCLE_TICKS, BlinkManager, BlinkPattern
 from .configuration import (
+    MAP_MODES,
     ButtonConfiguration,
     Configuration,
     EncoderConfiguration,
 )
-from .live import lazy_attribute
+from .input_coalescing import InputCoalescer
+from .instrumentation import MidiTrafficMonitor
+from .output import SHORT_MESSAGE_LENGTH, LedOutput
 
 NUM_TRACKS = 8
 NUM_SCENES = 3
 
+# How long (in seconds) a movement is considered to be ongoing after
+# the last accepted change. Changes smaller than the dead band are
+# accepted while a movement in the same direction is ongoing.
+DEAD_BAND_MOVEMENT_TIMEOUT = 0.25
+
+# Status bytes (for channel 0) of the message types used by elements.
+STATUS_BYTES = {MIDI_NOTE_TYPE: 0x90, MIDI_CC_TYPE: 0xB0, MIDI_PB_TYPE: 0xE0}
+
+# (status byte, identifier) for incoming messages. The identifier is
+# None for pitch bend messages.
+InputKey = typing.Tuple[int, typing.Optional[int]]
+
+# Configuration fields for individual buttons.
+BUTTON_NAMES = (
+    "track_left_button",
+    "track_right_button",
+    "cycle_button",
+    "marker_set_button",
+    "marker_left_button",
+    "marker_right_button",
+    "rewind_button",
+    "fast_forward_button",
+    "stop_button",
+    "play_button",
+    "record_button",
+)
+
+# Configuration fields which can be changed without reloading the
+# control surface.
+CONTROL_FIELDS = (
+    *BUTTON_NAMES,
+    "solo_buttons",
+    "mute_buttons",
+    "arm_buttons",
+    "sliders",
+    "knobs",
+)
+
 
 class BlinkingButtonElement(ButtonElement):
-    def __init__(self, *a, **k):
+    def __init__(self, *a, output: LedOutput, blink_manager: BlinkManager, **k):
         super().__init__(*a, **k)
 
+        # Outgoing values are routed through the shared output stage,
+        # which coalesces them into per-frame bursts.
+        self._output = output
+
+        # Cached to avoid building the key for every value sent.
+        self.output_key = output.key_for(self)
+
+        # Owned by the control surface's elements, like the output
+        # stage.
+        self._blink_manager = blink_manager
+
         # Current blink value generator, if any.
         self._value_generator: typing.Union[None, BlinkManager.ValueGenerator] = None
 
-        # Help the type checker.
-        self._tasks: task.TaskGroup
-
     def send_value(self, value, force=False, channel=None, is_blinking=False):
         """
-        :param bool is_blinking: whether this value is being sent as part of the blinking task.
+        :param bool is_blinking: whether this value is being sent as part of the blink cycle.
         """
 
-        # Don't kill the blink task if this is being called as
-        # part of the blink loop.
+        # Don't stop blinking if this is being called from the blink
+        # cycle.
         if not is_blinking:
             self._stop_blinking()
 
-        return super().send_value(value, force, channel)
+        self._output.send_value(self, value, force, channel)
+
+    def receive_value(self, value):
+        # Feedback for a button which was just pressed goes out before
+        # bulk updates.
+        self._output.prioritize_for_frame(self)
+        return super().receive_value(value)
+
+    def clear_send_cache(self):
+        super().clear_send_cache()
+        self._output.clear_shadow(self.output_key)
 
     # This gets invoked by `BlinkingColor` skin values.
-    def send_blink(self, ticks_per_toggle: int, blink_manager: BlinkManager):
-        # Don't do anything if we're already blinking at this rate.
-        if not (
-            self._value_generator
-            and self._value_generator.ticks_per_toggle is ticks_per_toggle
-        ):
-            self._start_blinking(ticks_per_toggle, blink_manager)
+    def send_blink(self, pattern: BlinkPattern):
+        # Don't do anything if we're already blinking with this pattern.
+        if not (self._value_generator and self._value_generator.pattern is pattern):
+            self._start_blinking(pattern)
+
+    # Move this button to a different MIDI address, e.g. after the
+    # configuration has been reloaded. The LED at the old address is
+    # turned off, and the new one gets drawn on the next update.
+    def rebind(self, identifier: int, channel: int):
+        self._stop_blinking()
+        self._output.clear_now(self)
+
+        self.set_identifier(identifier)
+        self.set_channel(channel)
+        self.output_key = self._output.key_for(self)
+        self.clear_send_cache()
 
-    def _start_blinking(self, ticks_per_toggle, blink_manager):
+    def disconnect(self):
+        self._stop_blinking()
+        super().disconnect()
+
+    # Called by the output stage when a value should actually be sent
+    # to the device.
+    def _send_value_now(self, value, force, channel):
+        return super().send_value(value, force, channel)
+
+    def _start_blinking(self, pattern):
         # Clean up the old blink state, if any.
         self._stop_blinking()
 
-        self._value_generator = blink_manager.get_value_generator(ticks_per_toggle)
-        self._blink_task.restart()
+        self._value_generator = self._blink_manager.get_value_generator(
+            pattern, self._handle_blink_value
+        )
 
     def _stop_blinking(self):
         if self._value_generator:
             self._value_generator.disconnect()
             self._value_generator = None
-            # Include this within the conditional - if no value
-            # generator has been set, the blink task must be killed or
-            # non-existent, so there's no need to call the lazy
-            # generator.
-            self._blink_task.kill()
-
-    @lazy_attribute
-    def _blink_task(self):
-        assert self._tasks
-        blink_task = self._tasks.add(task.loop(task.run(self._handle_blink_tick)))
-        blink_task.kill()
-        return blink_task
-
-    def _handle_blink_tick(self):
-        assert self._value_generator
-        self._value_generator.on_tick()
-
-        value = self._value_generator.value
+
+    # Invoked by the blink manager whenever the blink value for this
+    # button changes.
+    def _handle_blink_value(self, value):
         if value is not self._last_sent_value:
             self.send_value(value, is_blinking=True)
 
 
+class CoalescingEncoderElement(EncoderElement):
+    """
+    Encoder whose values can be filtered and coalesced before being written to Live.
+
+    When the coalescer is enabled, a dead band is set, or script input is forced (e.g.
+    so that MIDI captures include encoder input), the encoder doesn't get mapped to
+    its parameter by Live. Instead, values are forwarded to the script.
+    Absolute values within the dead band of the last accepted value are dropped, and
+    the most recent value (or, for relative encoders, the accumulated change) is
+    written to the parameter once per coalescing window, or immediately if coalescing
+    is disabled.
+    """
+
+    def __init__(
+        self,
+        *a,
+        coalescer: InputCoalescer,
+        dead_band: int = 0,
+        monitor: typing.Optional[MidiTrafficMonitor] = None,
+        script_input: bool = False,
+        **k,
+    ):
+        """
+        :param int dead_band: minimum change (in raw MIDI values) for an absolute value
+                              to be accepted, unless it continues a movement.
+        :param bool script_input: always forward values to the script, rather than
+                                  letting Live map them directly.
+        :param monitor: if set, every value received by the script is recorded here.
+                        Values which Live maps directly never reach the script.
+        """
+        super().__init__(*a, **k)
+        self._coalescer = coalescer
+        self._dead_band = dead_band
+        self._monitor = monitor
+        self._script_input = script_input
+
+        # Dead band state: the last accepted value, and the direction
+        # (1 or -1) and time of the last accepted change.
+        self._last_accepted_value: typing.Union[None, int] = None
+        self._movement_direction = 0
+        self._movement_time = 0.0
+
+        # Parameter which receives coalesced values, if any.
+        self._coalesced_parameter = None
+
+        # The latest absolute value, or the accumulated relative
+        # change, since the last write.
+        self._pending_value: typing.Union[None, int] = None
+
+        # Maximum raw value for absolute encoders.
+        self._max_value = 16383 if self.message_type() == MIDI_PB_TYPE else 127
+
+    def connect_to(self, parameter):
+        if not self._uses_script_input():
+            return super().connect_to(parameter)
+
+        self._coalesced_parameter = parameter
+        self._pending_value = None
+        self._coalescer.remove_pending(self)
+
+        # Listening to our own values causes them to be forwarded to
+        # the script rather than being mapped by Live.
+        self.__on_value.subject = self if parameter is not None else None
+
+    def release_parameter(self):
+        if self._uses_script_input():
+            self.connect_to(None)
+        return super().release_parameter()
+
+    def receive_value(self, value):
+        if self._monitor is not None:
+            self._monitor.record_input(self.name, SHORT_MESSAGE_LENGTH)
+        return super().receive_value(value)
+
+    # Move this encoder to a different MIDI address and/or dead band,
+    # e.g. after the configuration has been reloaded. The current
+    # parameter is reconnected, since the dead band determines whether
+    # values are mapped by Live or forwarded to the script.
+    def rebind(self, identifier: int, channel: int, dead_band: int):
+        parameter = (
+            self._coalesced_parameter
+            if self._uses_script_input()
+            else self.mapped_parameter()
+        )
+        self.release_parameter()
+
+        self.set_identifier(identifier)
+        self.set_channel(channel)
+        self._dead_band = dead_band
+        self._last_accepted_value = None
+        self._movement_direction = 0
+
+        if liveobj_valid(parameter):
+            self.connect_to(parameter)
+
+    # Called by the coalescer at the end of a window.
+    def write_pending_value(self):
+        value = self._pending_value
+        self._pending_value = None
+
+        parameter = self._coalesced_parameter
+        if value is None or not liveobj_valid(parameter):
+            return
+
+        value_range = parameter.max - parameter.min
+        if self._is_relative():
+            new_value = parameter.value + value * value_range / 127.0
+        else:
+            new_value = parameter.min + value * value_range / self._max_value
+
+        new_value = max(parameter.min, min(parameter.max, new_value))
+        if parameter.is_quantized:
+            new_value = round(new_value)
+        if new_value != parameter.value:
+            parameter.value = new_value
+
+    def _uses_script_input(self) -> bool:
+        return (
+            self._script_input
+            or self._coalescer.is_enabled
+            or (self._dead_band > 0 and not self._is_relative())
+        )
+
+    # Whether an absolute value should be passed on. Small changes are
+    # dropped, unless they continue a recent change in the same
+    # direction, so that slow movements still have full resolution
+    # while jitter at rest is ignored.
+    def _passes_dead_band(self, value: int) -> bool:
+        if self._dead_band <= 0:
+            return True
+
+        last_value = self._last_accepted_value
+        now = time.monotonic()
+        if last_value is not None:
+            delta = value - last_value
+            if delta == 0:
+                return False
+
+            direction = 1 if delta > 0 else -1
+            is_moving = (
+                direction == self._movement_direction
+                and now - self._movement_time < DEAD_BAND_MOVEMENT_TIMEOUT
+            )
+            if abs(delta) < self._dead_band and not is_moving:
+                return False
+            self._movement_direction = direction
+
+        self._last_accepted_value = value
+        self._movement_time = now
+        return True
+
+    def _is_relative(self) -> bool:
+        return self.message_map_mode() != MAP_MODES.absolute
+
+    def _relative_delta(self, value: int) -> int:
+        map_mode = self.message_map_mode()
+        if map_mode == MAP_MODES.relative_two_compliment:
+            return value - 128 if value >= 64 else value
+        if map_mode == MAP_MODES.relative_binary_offset:
+            return value - 64
+        # Signed bit.
+        return -(value & 0x3F) if value & 0x40 else value
+
+    @listens("value")
+    def __on_value(self, value):
+        if self._is_relative():
+            value = (self._pending_value or 0) + self._relative_delta(value)
+        elif not self._passes_dead_band(value):
+            return
+
+        self._pending_value = value
+        if self._coalescer.is_enabled:
+            self._coalescer.add_pending(self)
+        else:
+            self.write_pending_value()
+
+
 class Elements(ElementsBase):
     @depends(configuration=None)
     def __init__(
         self, *a, configuration: typing.Union[None, Configuration] = None, **k
     ):
+        start_time = time.perf_counter()
         super().__init__(*a, **k)
 
         assert configuration
         self._configuration = configuration
 
+        # Only created if enabled, so that the send and receive paths
+        # don't do any extra work otherwise.
+        self.traffic_monitor: typing.Optional[MidiTrafficMonitor] = (
+            MidiTrafficMonitor() if configuration.midi_instrumentation else None
+        )
+
+        self.led_output = LedOutput(
+            monitor=self.traffic_monitor,
+            messages_per_ms=configuration.midi_output_messages_per_ms,
+        )
+        self.input_coalescer = InputCoalescer(configuration.encoder_coalescing_ticks)
+
+        # Blink state is per control surface, since the manager
+        # listens to its song and runs in its task group.
+        self.blink_manager = BlinkManager(BLINK_CYCLE_TICKS)
+
+        # Encoder configurations by (msg_type, channel, identifier), for
+        # settings which can't be passed through the matrix helpers.
+        self._encoder_configurations = self._get_encoder_configurations(configuration)
+
         # Type checker helpers for implicitly created attributes.
         self.mixer_buttons = None
 
         self._add_physical_elements()
         self._add_meta_elements()
+        self._check_input_collisions(configuration)
+
+        # Reported as part of the startup timings.
+        self.construction_time = time.perf_counter() - start_time
+
+    def reconfigure(self, configuration: Configuration) -> bool:
+        """
+        Rebind elements whose control configuration differs from the current one, in
+        place. Returns False without changing anything if the new configuration can't be
+        applied this way, i.e. if a message type, map mode or number of controls
+        changed. Raises a ValueError, also without changing anything, if two controls
+        would receive the same message.
+        """
+        changes: typing.List[typing.Tuple[typing.Any, typing.Any]] = []
+        for field, elements in self._get_elements_by_field().items():
+            old_value = getattr(self._configuration, field)
+            new_value = getattr(configuration, field)
+            if old_value == new_value:
+                continue
+
+            if not isinstance(old_value, list):
+                old_value, new_value = [old_value], [new_value]
+            if len(new_value) != len(old_value):
+                return False
+
+            for element, old, new in zip(elements, old_value, new_value, strict=True):
+                if old == new:
+                    continue
+                if old.msg_type != new.msg_type or getattr(
+                    old, "map_mode", None
+                ) != getattr(new, "map_mode", None):
+                    return False
+                changes.append((element, new))
+
+        # Check for collisions before changing anything.
+        self._check_input_collisions(configuration)
+
+        for element, control_configuration in changes:
+            if isinstance(control_configuration, EncoderConfiguration):
+                element.rebind(
+                    control_configuration.identifier,
+                    control_configuration.channel,
+                    control_configuration.dead_band,
+                )
+            else:
+                element.rebind(
+                    control_configuration.identifier, control_configuration.channel
+                )
+
+        self._configuration = configuration
+        self._encoder_configurations = self._get_encoder_configurations(configuration)
+        return True
 
     # The base class' button helpers don't allow for providing
     # an alternate button factory via arguments; we need to reimplement them with
@@ -116,23 +437,92 @@ class Elements(ElementsBase):
             **k,
         )
 
+    def add_encoder_matrix(self, identifiers, base_name, channels=None, *a, **k):
+        (self.add_matrix)(
+            identifiers,
+            base_name,
+            *a,
+            channels=channels,
+            element_factory=self._create_encoder,
+            **k,
+        )
+
+    def _create_encoder(self, identifier, name, **k):
+        configuration = self._encoder_configurations.get(
+            (k.get("msg_type"), k.get("channel"), identifier)
+        )
+        encoder = CoalescingEncoderElement(
+            identifier,
+            name=name,
+            coalescer=self.input_coalescer,
+            dead_band=configuration.dead_band if configuration else 0,
+            monitor=self.traffic_monitor,
+            # Input which Live maps directly never reaches the script,
+            # so it couldn't be captured.
+            script_input=self._configuration.midi_capture_path is not None,
+            **k,
+        )
+        return encoder
+
     def _create_button(self, identifier, name, **k):
-        return BlinkingButtonElement(identifier, name=name, **k)
+        button = BlinkingButtonElement(
+            identifier,
+            name=name,
+            output=self.led_output,
+            blink_manager=self.blink_manager,
+            **k,
+        )
+        return button
+
+    # Raises a ValueError if two controls would receive the same
+    # message, in which case one of them would never see any input.
+    def _check_input_collisions(self, configuration: Configuration):
+        names_by_key: typing.Dict[InputKey, str] = {}
+        for field, elements in self._get_elements_by_field().items():
+            value = getattr(configuration, field)
+            for element, control_configuration in zip(
+                elements, value if isinstance(value, list) else [value], strict=True
+            ):
+                msg_type = control_configuration.msg_type
+                key: InputKey = (
+                    STATUS_BYTES[msg_type] | control_configuration.channel,
+                    None
+                    if msg_type == MIDI_PB_TYPE
+                    else control_configuration.identifier,
+                )
+                existing_name = names_by_key.get(key)
+                if existing_name is not None:
+                    raise ValueError(
+                        f"{element.name} uses the same MIDI message as {existing_name}"
+                    )
+                names_by_key[key] = element.name
+
+    @staticmethod
+    def _get_encoder_configurations(configuration: Configuration):
+        return {
+            (c.msg_type, c.channel, c.identifier): c
+            for c in (*configuration.sliders, *configuration.knobs)
+        }
+
+    # Elements for each control field in the configuration, in the
+    # same order as the field's configurations.
+    def _get_elements_by_field(self) -> typing.Dict[str, typing.List[typing.Any]]:
+        assert self.mixer_buttons
+        elements_by_field = {name: [getattr(self, name)] for name in BUTTON_NAMES}
+        for row, name in enumerate(("solo_buttons", "mute_buttons", "arm_buttons")):
+            elements_by_field[name] = [
+                self.mixer_buttons.get_button(column, row)
+                for column in range(NUM_TRACKS)
+            ]
+        for name in ("sliders", "knobs"):
+            elements_by_field[name] = [
+                getattr(self, name).get_button(column, 0)
+                for column in range(NUM_TRACKS)
+            ]
+        return elements_by_field
 
     def _add_physical_elements(self):
-        for name in [
-            "track_left_button",
-            "track_right_button",
-            "cycle_button",
-            "marker_set_button",
-            "marker_left_button",
-            "marker_right_button",
-            "rewind_button",
-            "fast_forward_button",
-            "stop_button",
-            "play_button",
-            "record_button",
-        ]:
+        for name in BUTTON_NAMES:
             control_config = getattr(self._configuration, name)
             self.add_button(
                 control_config.identifier,
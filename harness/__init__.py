@@ -0,0 +1,210 @@
+# Headless harness for running NK2Reshift outside of Ableton Live,
+# e.g. for benchmarks.
+#
+# The `ableton` framework packages are pure Python, and are loaded from
+# the decompiled sources generated by `make deps` (or from the
+# directory in the `NK2RESHIFT_REMOTE_SCRIPTS` environment variable).
+# The native `Live` module is replaced by the stand-in in `fake_live`.
+#
+#   from harness import Harness
+#
+#   harness = Harness()
+#   harness.identify()
+#   harness.send_midi(0x90, 93, 127)  # Press STOP (SHIFT mode).
+#   harness.tick()
+#   print(harness.sent_midi)
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import time
+import types
+import typing
+from pathlib import Path
+
+from . import fake_live
+from .c_instance import CInstance
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+SCRIPT_PACKAGE_NAME = "NK2Reshift"
+REMOTE_SCRIPTS_DIR = Path(
+    os.environ.get(
+        "NK2RESHIFT_REMOTE_SCRIPTS",
+        SCRIPT_DIR / "__ext__" / "System_MIDIRemoteScripts",
+    )
+)
+
+# The identity response sent by a nanoKONTROL2.
+IDENTITY_RESPONSE = (
+    0xF0,
+    0x7E,
+    0x00,
+    0x06,
+    0x02,
+    0x42,
+    0x13,
+    0x01,
+    0x00,
+    0x00,
+    0x03,
+    0x00,
+    0x01,
+    0x00,
+    0xF7,
+)
+
+
+# Import the control surface package under `SCRIPT_PACKAGE_NAME`,
+# installing the fake `Live` module first. Returns the package
+# module. The import time is recorded as `import_time` on the module.
+def load_script() -> types.ModuleType:
+    if SCRIPT_PACKAGE_NAME in sys.modules:
+        return sys.modules[SCRIPT_PACKAGE_NAME]
+
+    fake_live.install()
+    if REMOTE_SCRIPTS_DIR.is_dir() and str(REMOTE_SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(REMOTE_SCRIPTS_DIR))
+
+    try:
+        import ableton.v3  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(
+            f"could not import the ableton framework from {REMOTE_SCRIPTS_DIR}; "
+            "run `make deps` or set NK2RESHIFT_REMOTE_SCRIPTS"
+        ) from e
+
+    spec = importlib.util.spec_from_file_location(
+        SCRIPT_PACKAGE_NAME,
+        SCRIPT_DIR / "__init__.py",
+        submodule_search_locations=[str(SCRIPT_DIR)],
+    )
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[SCRIPT_PACKAGE_NAME] = module
+
+    start_time = time.perf_counter()
+    spec.loader.exec_module(module)
+    module.import_time = time.perf_counter() - start_time
+
+    return module
+
+
+# A control surface instance connected to a fake Live set.
+class Harness:
+    def __init__(
+        self,
+        configuration: typing.Any = None,
+        num_tracks: int = 8,
+        num_scenes: int = 8,
+        num_returns: int = 2,
+    ):
+        """
+        :param configuration: a `Configuration` to use instead of the default (or
+                              `user.py`) configuration.
+        """
+        self.package = load_script()
+
+        self.song = fake_live.Song(
+            num_tracks=num_tracks, num_scenes=num_scenes, num_returns=num_returns
+        )
+        self.application = fake_live.Application(self.song)
+        fake_live.set_application(self.application)
+
+        self.c_instance = CInstance(self.song)
+        self.midi_map = fake_live.MidiMapRecorder()
+
+        # MIDI messages which were neither forwarded nor mapped when
+        # they were injected.
+        self.dropped_midi: typing.List[typing.Tuple[int, ...]] = []
+
+        if configuration is not None:
+            self.package._configuration = configuration
+
+        start_time = time.perf_counter()
+        self.surface = self.package.create_instance(self.c_instance)
+        self.setup_time = time.perf_counter() - start_time
+
+        self.rebuild_midi_map()
+
+    @property
+    def sent_midi(self) -> typing.List[typing.Tuple[float, typing.Tuple[int, ...]]]:
+        """
+        Outgoing MIDI messages as (timestamp, bytes).
+        """
+        return self.c_instance.sent_midi
+
+    def clear_sent_midi(self):
+        del self.c_instance.sent_midi[:]
+
+    def rebuild_midi_map(self):
+        self.c_instance.midi_map_rebuild_requested = False
+        self.midi_map = fake_live.MidiMapRecorder()
+        self.surface.build_midi_map(self.midi_map)
+
+    def identify(self):
+        self.send_midi(*IDENTITY_RESPONSE)
+
+    # Simulate the device being unplugged and plugged back in: Live
+    # reopens the ports, and the device answers the identity request.
+    def reconnect(self):
+        self.surface.port_settings_changed()
+        self.identify()
+
+    def send_midi(self, *midi_bytes: int) -> float:
+        """
+        Deliver a MIDI message the way Live would: to the script if it has been
+        forwarded, or directly to a parameter if it has been mapped. Returns the time
+        taken to process the message, in seconds.
+        """
+        if self.c_instance.midi_map_rebuild_requested:
+            self.rebuild_midi_map()
+
+        start_time = time.perf_counter()
+        status = midi_bytes[0]
+        if status == 0xF0:
+            self.surface.receive_midi(midi_bytes)
+        else:
+            key = (status, None if status & 0xF0 == 0xE0 else midi_bytes[1])
+            if key in self.midi_map.forwarded:
+                self.surface.receive_midi(midi_bytes)
+            elif key in self.midi_map.mapped:
+                self._apply_mapped_value(*self.midi_map.mapped[key], midi_bytes)
+            else:
+                self.dropped_midi.append(midi_bytes)
+
+        return time.perf_counter() - start_time
+
+    def tick(self, count: int = 1) -> float:
+        """
+        Run the given number of scheduler ticks (Live runs one every 100ms). Returns
+        the total processing time, in seconds.
+        """
+        start_time = time.perf_counter()
+        for _ in range(count):
+            if self.c_instance.midi_map_rebuild_requested:
+                self.rebuild_midi_map()
+            self.surface.update_display()
+        return time.perf_counter() - start_time
+
+    def disconnect(self):
+        self.surface.disconnect()
+
+    @staticmethod
+    def _apply_mapped_value(parameter, map_mode, midi_bytes):
+        if parameter is None:
+            return
+
+        value_range = parameter.max - parameter.min
+        if midi_bytes[0] & 0xF0 == 0xE0:
+            normalized = ((midi_bytes[2] << 7) | midi_bytes[1]) / 16383.0
+            parameter.value = parameter.min + normalized * value_range
+        elif map_mode == fake_live.MapMode.absolute:
+            parameter.value = parameter.min + midi_bytes[2] / 127.0 * value_range
+        else:
+            value = midi_bytes[2]
+            delta = -(value & 0x3F) if value & 0x40 else value
+            parameter.value = max(
+                parameter.min,
+                min(parameter.max, parameter.value + delta / 127.0 * value_range),
+            )
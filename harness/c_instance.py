@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import time
+import typing
+
+from .fake_live import NULL, Song
+
+
+# Opaque handle passed to the `Live.MidiMap` functions.
+class _ScriptHandle:
+    pass
+
+
+# Stand-in for the `c_instance` object which Live passes to
+# `create_instance`. Outgoing MIDI is recorded along with a timestamp
+# (seconds since the instance was created).
+class CInstance:
+    def __init__(self, song: Song):
+        self._song = song
+        self._handle = _ScriptHandle()
+        self._start_time = time.perf_counter()
+
+        self.sent_midi: typing.List[typing.Tuple[float, typing.Tuple[int, ...]]] = []
+        self.messages: typing.List[str] = []
+
+        # Set when the script asks for the MIDI map to be rebuilt. The
+        # harness rebuilds it before delivering the next input.
+        self.midi_map_rebuild_requested = False
+
+    def song(self):
+        return self._song
+
+    def handle(self):
+        return self._handle
+
+    def instance_identifier(self):
+        return 0
+
+    def send_midi(self, midi_bytes):
+        self.sent_midi.append(
+            (time.perf_counter() - self._start_time, tuple(midi_bytes))
+        )
+
+    def show_message(self, message):
+        self.messages.append(message)
+
+    def log_message(self, *_a):
+        pass
+
+    def request_rebuild_midi_map(self):
+        self.midi_map_rebuild_requested = True
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return NULL
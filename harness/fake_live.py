@@ -0,0 +1,701 @@
+# A stand-in for the `Live` module, which is only available inside
+# Ableton Live. It models the parts of the Live Object Model (LOM)
+# that NK2Reshift and the framework components interact with, closely
+# enough to build and drive the control surface. Anything that isn't
+# modeled explicitly resolves to an inert placeholder.
+from __future__ import annotations
+
+import sys
+import types
+import typing
+
+
+# Returned for unmodeled LOM attributes. It's falsy, empty, compares
+# equal to `None` (so `liveobj_valid` treats it as a deleted object),
+# and absorbs attribute access and calls.
+class _Null:
+    def __call__(self, *_a, **_k):
+        return self
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self
+
+    def __bool__(self):
+        return False
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __int__(self):
+        return 0
+
+    def __index__(self):
+        return 0
+
+    def __float__(self):
+        return 0.0
+
+    def __eq__(self, other):
+        return other is None or other is self
+
+    def __hash__(self):
+        return id(self)
+
+    def __repr__(self):
+        return "<Null>"
+
+
+NULL = _Null()
+_MISSING = object()
+
+
+# Placeholder types for Live classes which aren't modeled explicitly,
+# e.g. `Live.Clip.GridQuantization`. Nested attributes are created on
+# demand.
+class _PlaceholderType(type):
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = _PlaceholderType(name, (), {})
+        setattr(cls, name, value)
+        return value
+
+
+class _PlaceholderModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = _PlaceholderType(name, (), {})
+        setattr(self, name, value)
+        return value
+
+
+# Boost.Python-style enum values: ints with a name, grouped in a
+# namespace with a `values` dict.
+class _EnumValue(int):
+    name: str
+
+    def __new__(cls, value: int, name: str):
+        result = super().__new__(cls, value)
+        result.name = name
+        return result
+
+    def __repr__(self):
+        return self.name
+
+
+def _enum(name: str, value_names: typing.Sequence[str]) -> typing.Any:
+    values = {index: _EnumValue(index, n) for index, n in enumerate(value_names)}
+    namespace = {v.name: v for v in values.values()}
+    namespace["values"] = values
+    return type(name, (), namespace)
+
+
+# Base class for LOM objects. Public attribute assignments notify
+# listeners registered through the usual `add_<name>_listener`,
+# `remove_<name>_listener` and `<name>_has_listener` methods.
+class LiveObject:
+    def __init__(self, **properties):
+        object.__setattr__(self, "_listeners", {})
+        object.__setattr__(self, "canonical_parent", None)
+        for name, value in properties.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+            return
+
+        changed = self.__dict__.get(name, _MISSING) != value
+        object.__setattr__(self, name, value)
+        if changed:
+            self.notify(name)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        if name.startswith("add_") and name.endswith("_listener"):
+            return lambda *args: self._add_listener(name[4:-9], args)
+        if name.startswith("remove_") and name.endswith("_listener"):
+            return lambda *args: self._remove_listener(name[7:-9], args)
+        if name.endswith("_has_listener"):
+            return lambda *args: self._has_listener(name[:-13], args)
+
+        return NULL
+
+    # Notify listeners of the given property. Listeners registered
+    # with extra arguments (e.g. `add_is_view_visible_listener("Detail",
+    # listener)`) are only notified if `args` match or are omitted.
+    def notify(self, name: str, *args):
+        for extra_args, listener in list(self._listeners.get(name, ())):
+            if not args or args == extra_args:
+                listener()
+
+    def listener_count(self, name: typing.Optional[str] = None) -> int:
+        if name is None:
+            return sum(len(entries) for entries in self._listeners.values())
+        return len(self._listeners.get(name, ()))
+
+    def _add_listener(self, name, args):
+        self._listeners.setdefault(name, []).append((tuple(args[:-1]), args[-1]))
+
+    def _remove_listener(self, name, args):
+        self._listeners[name].remove((tuple(args[:-1]), args[-1]))
+
+    def _has_listener(self, name, args):
+        return (tuple(args[:-1]), args[-1]) in self._listeners.get(name, ())
+
+
+class DeviceParameter(LiveObject):
+    def __init__(self, name="Parameter", value=0.0, min=0.0, max=1.0, **k):
+        super().__init__(
+            name=name,
+            original_name=name,
+            value=value,
+            default_value=value,
+            min=min,
+            max=max,
+            is_enabled=True,
+            is_quantized=False,
+            state=ParameterState.enabled,
+            automation_state=0,
+            value_items=(),
+            **k,
+        )
+
+    def str_for_value(self, value):
+        return str(value)
+
+    def __str__(self):
+        return str(self.value)
+
+
+class Device(LiveObject):
+    def __init__(self, name="Device", class_name="PluginDevice", num_parameters=8):
+        super().__init__(
+            name=name,
+            class_name=class_name,
+            class_display_name=class_name,
+            type=1,
+            can_have_chains=False,
+            can_have_drum_pads=False,
+            is_active=True,
+            parameters=[DeviceParameter("Device On", 1.0)]
+            + [DeviceParameter(f"Parameter {i + 1}") for i in range(num_parameters)],
+            view=LiveObject(is_collapsed=False, selected_chain=None),
+        )
+
+
+class MixerDevice(LiveObject):
+    def __init__(self, num_sends=0):
+        super().__init__(
+            volume=DeviceParameter("Track Volume", 0.85),
+            panning=DeviceParameter("Track Panning", 0.0, -1.0, 1.0),
+            track_activator=DeviceParameter("Speaker On", 1.0),
+            crossfader=DeviceParameter("Crossfader", 0.0, -1.0, 1.0),
+            cue_volume=DeviceParameter("Cue Volume", 0.85),
+            song_tempo=DeviceParameter("Song Tempo", 120.0, 20.0, 999.0),
+            sends=[DeviceParameter(f"Send {i + 1}") for i in range(num_sends)],
+        )
+
+
+class Clip(LiveObject):
+    def __init__(self, name="Clip"):
+        super().__init__(
+            name=name,
+            color=0,
+            color_index=0,
+            is_playing=False,
+            is_triggered=False,
+            is_recording=False,
+            is_audio_clip=False,
+            is_midi_clip=True,
+            playing_position=0.0,
+            length=4.0,
+            looping=True,
+            muted=False,
+        )
+
+    def fire(self):
+        self.is_triggered = True
+
+    def stop(self):
+        self.is_playing = False
+        self.is_triggered = False
+
+
+class ClipSlot(LiveObject):
+    def __init__(self, clip=None):
+        super().__init__(
+            clip=clip,
+            has_clip=clip is not None,
+            has_stop_button=True,
+            is_triggered=False,
+            is_playing=False,
+            is_recording=False,
+            is_group_slot=False,
+            controls_other_clips=False,
+            playing_status=0,
+            will_record_on_start=False,
+            color=0,
+            color_index=0,
+        )
+
+    def fire(self, *_a, **_k):
+        if self.clip is not None:
+            self.clip.fire()
+        self.is_triggered = True
+
+    def stop(self):
+        if self.clip is not None:
+            self.clip.stop()
+        self.is_triggered = False
+
+    def set_fire_button_state(self, _state):
+        pass
+
+
+class Track(LiveObject):
+    def __init__(
+        self,
+        name="Track",
+        num_scenes=0,
+        num_sends=0,
+        has_midi_input=True,
+        can_be_armed=True,
+    ):
+        super().__init__(
+            name=name,
+            color=0,
+            color_index=0,
+            arm=False,
+            implicit_arm=False,
+            mute=False,
+            solo=False,
+            muted_via_solo=False,
+            can_be_armed=can_be_armed,
+            has_audio_input=not has_midi_input,
+            has_midi_input=has_midi_input,
+            has_audio_output=True,
+            has_midi_output=False,
+            is_foldable=False,
+            fold_state=False,
+            is_grouped=False,
+            group_track=None,
+            is_visible=True,
+            is_frozen=False,
+            is_part_of_selection=False,
+            playing_slot_index=-1,
+            fired_slot_index=-1,
+            output_meter_level=0.0,
+            output_meter_left=0.0,
+            output_meter_right=0.0,
+            current_monitoring_state=1,
+            mixer_device=MixerDevice(num_sends),
+            clip_slots=[ClipSlot() for _ in range(num_scenes)],
+            devices=[],
+            view=LiveObject(selected_device=None, device_insert_mode=0),
+        )
+
+    def stop_all_clips(self, *_a, **_k):
+        for clip_slot in self.clip_slots:
+            clip_slot.stop()
+
+
+class Scene(LiveObject):
+    def __init__(self, name=""):
+        super().__init__(
+            name=name,
+            color=0,
+            color_index=0,
+            is_empty=True,
+            is_triggered=False,
+            tempo=-1.0,
+        )
+
+    def fire(self, *_a, **_k):
+        self.is_triggered = True
+
+    def fire_as_selected(self, *_a, **_k):
+        self.fire()
+
+
+class SongView(LiveObject):
+    def __init__(self, song: Song):
+        super().__init__(
+            selected_track=song.tracks[0] if song.tracks else song.master_track,
+            selected_scene=song.scenes[0] if song.scenes else None,
+            selected_parameter=None,
+            selected_chain=None,
+            detail_clip=None,
+            highlighted_clip_slot=None,
+            follow_song=False,
+            draw_mode=True,
+        )
+
+    def select_device(self, device, *_a):
+        self.selected_track.view.selected_device = device
+
+
+class Song(LiveObject):
+    def __init__(self, num_tracks=8, num_scenes=8, num_returns=2):
+        super().__init__(
+            tempo=120.0,
+            is_playing=False,
+            current_song_time=0.0,
+            signature_numerator=4,
+            signature_denominator=4,
+            clip_trigger_quantization=Quantization.q_bar,
+            midi_recording_quantization=0,
+            metronome=False,
+            record_mode=False,
+            session_record=False,
+            session_record_status=0,
+            session_automation_record=False,
+            arrangement_overdub=False,
+            overdub=False,
+            loop=False,
+            nudge_up=False,
+            nudge_down=False,
+            can_undo=False,
+            can_redo=False,
+            can_capture_midi=False,
+            is_counting_in=False,
+            re_enable_automation_enabled=False,
+            back_to_arranger=False,
+            exclusive_arm=True,
+            exclusive_solo=True,
+            appointed_device=None,
+            song_length=0.0,
+            root_note=0,
+            scale_name="Major",
+            scale_intervals=(0, 2, 4, 5, 7, 9, 11),
+            return_tracks=[
+                Track(f"{chr(ord('A') + i)}-Return", num_sends=num_returns)
+                for i in range(num_returns)
+            ],
+            master_track=Track("Master", can_be_armed=False),
+            scenes=[Scene() for _ in range(num_scenes)],
+        )
+        self.tracks = [
+            Track(
+                f"{i + 1}-MIDI",
+                num_scenes=num_scenes,
+                num_sends=num_returns,
+            )
+            for i in range(num_tracks)
+        ]
+        for track in self.tracks + self.return_tracks + [self.master_track]:
+            track.canonical_parent = self
+        self.view = SongView(self)
+
+    @property
+    def visible_tracks(self):
+        return [track for track in self.tracks if track.is_visible]
+
+    def get_current_beats_song_time(self):
+        return self.current_song_time
+
+    def start_playing(self):
+        self.is_playing = True
+
+    def continue_playing(self):
+        self.is_playing = True
+
+    def stop_playing(self):
+        self.is_playing = False
+
+    def stop_all_clips(self, *_a, **_k):
+        for track in self.tracks:
+            track.stop_all_clips()
+
+
+class ApplicationView(LiveObject):
+    def __init__(self):
+        super().__init__(focused_document_view="Session", browse_mode=False)
+        self._visible_views = {"Session", "Detail", "Detail/DeviceChain"}
+
+    def is_view_visible(self, view_name, *_a):
+        return view_name in self._visible_views
+
+    def show_view(self, view_name):
+        self._set_view_visible(view_name, True)
+        if view_name.startswith("Detail/"):
+            other = (
+                "Detail/Clip"
+                if view_name == "Detail/DeviceChain"
+                else "Detail/DeviceChain"
+            )
+            self._set_view_visible(other, False)
+            self._set_view_visible("Detail", True)
+
+    def hide_view(self, view_name):
+        self._set_view_visible(view_name, False)
+
+    def focus_view(self, view_name):
+        self.show_view(view_name)
+
+    def _set_view_visible(self, view_name, is_visible):
+        if (view_name in self._visible_views) is not is_visible:
+            if is_visible:
+                self._visible_views.add(view_name)
+            else:
+                self._visible_views.discard(view_name)
+            self.notify("is_view_visible", view_name)
+
+
+class Application(LiveObject):
+    def __init__(self, song: Song):
+        super().__init__(view=ApplicationView(), control_surfaces=[])
+        self._song = song
+
+    def get_document(self):
+        return self._song
+
+    def get_major_version(self):
+        return 12
+
+    def get_minor_version(self):
+        return 3
+
+    def get_bugfix_version(self):
+        return 0
+
+
+# Live's timers aren't run by the harness; scheduler ticks are driven
+# explicitly with `Harness.tick`. The settings are kept for inspection.
+class Timer:
+    def __init__(self, callback=None, interval=1, repeat=False, **_k):
+        self._callback = callback
+        self.interval = interval
+        self.repeat = repeat
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+MapMode = _enum(
+    "MapMode",
+    [
+        "absolute",
+        "absolute_14_bit",
+        "relative_signed_bit",
+        "relative_signed_bit2",
+        "relative_binary_offset",
+        "relative_two_compliment",
+        "relative_smooth_signed_bit",
+        "relative_smooth_signed_bit2",
+        "relative_smooth_binary_offset",
+        "relative_smooth_two_compliment",
+    ],
+)
+
+Quantization = _enum(
+    "Quantization",
+    [
+        "q_no_q",
+        "q_8_bars",
+        "q_4_bars",
+        "q_2_bars",
+        "q_bar",
+        "q_half",
+        "q_half_triplet",
+        "q_quarter",
+        "q_quarter_triplet",
+        "q_eight",
+        "q_eight_triplet",
+        "q_sixtenth",
+        "q_sixtenth_triplet",
+        "q_thirtytwoth",
+    ],
+)
+
+RecordingQuantization = _enum(
+    "RecordingQuantization",
+    [
+        "rec_q_no_q",
+        "rec_q_quarter",
+        "rec_q_eight",
+        "rec_q_eight_triplet",
+        "rec_q_eight_eight_triplet",
+        "rec_q_sixtenth",
+        "rec_q_sixtenth_triplet",
+        "rec_q_sixtenth_sixtenth_triplet",
+        "rec_q_thirtysecond",
+    ],
+)
+
+ParameterState = _enum("ParameterState", ["enabled", "irrelevant", "disabled"])
+
+
+# Stand-in for the MIDI map handle passed to `build_midi_map`. The
+# `Live.MidiMap` functions below record forwarding and mapping
+# requests here, so the harness can route injected MIDI the same way
+# Live would.
+class MidiMapRecorder:
+    def __init__(self):
+        # (status, identifier) -> None, for messages forwarded to the
+        # script. Pitch bend messages use `None` as the identifier.
+        self.forwarded: typing.Dict[typing.Tuple[int, typing.Optional[int]], None] = {}
+
+        # (status, identifier) -> (parameter, map_mode), for messages
+        # which Live applies to a parameter directly.
+        self.mapped: typing.Dict[
+            typing.Tuple[int, typing.Optional[int]], typing.Tuple[typing.Any, int]
+        ] = {}
+
+
+def _find_recorder(args) -> MidiMapRecorder:
+    for arg in args:
+        if isinstance(arg, MidiMapRecorder):
+            return arg
+    raise ValueError("no MIDI map handle in arguments")
+
+
+def _parameter_arg(args):
+    for arg in args:
+        if isinstance(arg, DeviceParameter):
+            return arg
+    return None
+
+
+def _forward_midi_note(*args, **_k):
+    recorder = _find_recorder(args)
+    channel, note = [a for a in args if isinstance(a, int)][:2]
+    recorder.forwarded[(0x90 | channel, note)] = None
+    recorder.forwarded[(0x80 | channel, note)] = None
+    return True
+
+
+def _forward_midi_cc(*args, **_k):
+    recorder = _find_recorder(args)
+    channel, cc = [a for a in args if isinstance(a, int)][:2]
+    recorder.forwarded[(0xB0 | channel, cc)] = None
+    return True
+
+
+def _forward_midi_pitchbend(*args, **_k):
+    recorder = _find_recorder(args)
+    channel = [a for a in args if isinstance(a, int)][0]
+    recorder.forwarded[(0xE0 | channel, None)] = None
+    return True
+
+
+def _map_midi_cc(*args, **_k):
+    recorder = _find_recorder(args)
+    ints = [a for a in args if isinstance(a, int) and not isinstance(a, bool)]
+    channel, cc, map_mode = (ints + [0, 0, 0])[:3]
+    recorder.mapped[(0xB0 | channel, cc)] = (_parameter_arg(args), map_mode)
+    return True
+
+
+def _map_midi_note(*args, **_k):
+    recorder = _find_recorder(args)
+    channel, note = [a for a in args if isinstance(a, int)][:2]
+    recorder.mapped[(0x90 | channel, note)] = (_parameter_arg(args), 0)
+    return True
+
+
+def _map_midi_pitchbend(*args, **_k):
+    recorder = _find_recorder(args)
+    channel = [a for a in args if isinstance(a, int)][0]
+    recorder.mapped[(0xE0 | channel, None)] = (
+        _parameter_arg(args),
+        MapMode.absolute_14_bit,
+    )
+    return True
+
+
+class _FeedbackRule:
+    def __init__(self):
+        self.channel = 0
+        self.cc_no = 0
+        self.note_no = 0
+        self.cc_value_map = ()
+        self.vel_map = ()
+        self.delay_in_ms = 0.0
+        self.enabled = True
+
+
+_current_application: typing.Optional[Application] = None
+
+
+def set_application(application: Application):
+    global _current_application
+    _current_application = application
+
+
+def _get_application():
+    assert _current_application, "no application has been set up"
+    return _current_application
+
+
+# Build the fake `Live` package, and register it (along with its
+# submodules) in `sys.modules`.
+def install() -> types.ModuleType:
+    if "Live" in sys.modules:
+        return sys.modules["Live"]
+
+    live = _PlaceholderModule("Live")
+
+    def submodule(name: str, **attrs) -> types.ModuleType:
+        module = _PlaceholderModule(f"Live.{name}")
+        for attr_name, value in attrs.items():
+            setattr(module, attr_name, value)
+        setattr(live, name, module)
+        sys.modules[module.__name__] = module
+        return module
+
+    submodule(
+        "Application",
+        Application=Application,
+        get_application=_get_application,
+        combine_apcs=lambda: False,
+    )
+    submodule("Base", Timer=Timer)
+    submodule("Clip", Clip=Clip)
+    submodule("ClipSlot", ClipSlot=ClipSlot)
+    submodule("Device", Device=Device)
+    submodule(
+        "DeviceParameter",
+        DeviceParameter=DeviceParameter,
+        ParameterState=ParameterState,
+    )
+    submodule(
+        "MidiMap",
+        MapMode=MapMode,
+        CCFeedbackRule=_FeedbackRule,
+        NoteFeedbackRule=_FeedbackRule,
+        PitchBendFeedbackRule=_FeedbackRule,
+        forward_midi_cc=_forward_midi_cc,
+        forward_midi_note=_forward_midi_note,
+        forward_midi_pitchbend=_forward_midi_pitchbend,
+        map_midi_cc=_map_midi_cc,
+        map_midi_cc_with_feedback_map=_map_midi_cc,
+        map_midi_note=_map_midi_note,
+        map_midi_note_with_feedback_map=_map_midi_note,
+        map_midi_pitchbend=_map_midi_pitchbend,
+        map_midi_pitchbend_with_feedback_map=_map_midi_pitchbend,
+        send_feedback_for_parameter=lambda *_a, **_k: None,
+    )
+    submodule("MixerDevice", MixerDevice=MixerDevice)
+    submodule("Scene", Scene=Scene)
+    submodule(
+        "Song",
+        Song=Song,
+        Quantization=Quantization,
+        RecordingQuantization=RecordingQuantization,
+    )
+    submodule("Track", Track=Track)
+
+    sys.modules["Live"] = live
+    return live
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import typing
+
+from ableton.v3.base import depends, task
+
+if typing.TYPE_CHECKING:
+    from .elements import CoalescingEncoderElement
+
+
+# Collects values from encoders (sliders and knobs) and writes only
+# the most recent value for each encoder to Live, once per window of
+# some number of scheduler ticks. A fast fader move can produce
+# hundreds of messages per second, and this turns them into at most
+# one parameter write per window.
+#
+# A single task is shared by all encoders. It's started when a value
+# arrives and no window is open, and finishes after writing.
+class InputCoalescer:
+    def __init__(self, window_ticks: int):
+        """
+        :param int window_ticks: the number of scheduler ticks over which values are
+                                 coalesced. If 0, coalescing is disabled and encoders
+                                 are mapped to their parameters directly by Live.
+        """
+        self._window_ticks = window_ticks
+
+        # Encoders with a pending value. Dict used as an
+        # insertion-ordered set.
+        self._pending_elements: typing.Dict[CoalescingEncoderElement, None] = {}
+
+        self._flush_task: typing.Union[None, task.Task] = None
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._window_ticks > 0
+
+    def add_pending(self, element: CoalescingEncoderElement):
+        self._pending_elements[element] = None
+        if self._flush_task is None:
+            self._start_flush_task()
+
+    def remove_pending(self, element: CoalescingEncoderElement):
+        self._pending_elements.pop(element, None)
+
+    def flush(self):
+        self._flush_task = None
+        pending_elements = self._pending_elements
+        self._pending_elements = {}
+        for element in pending_elements:
+            element.write_pending_value()
+
+    # The task group is only available while a control surface is
+    # active, so it's looked up whenever a window opens.
+    @depends(parent_task_group=None)
+    def _start_flush_task(self, parent_task_group=None):
+        assert parent_task_group
+        # Added tasks first run on the next tick, so a one-tick window
+        # doesn't need any additional delay.
+        self._flush_task = parent_task_group.add(
+            task.sequence(task.delay(self._window_ticks - 1), task.run(self.flush))
+        )
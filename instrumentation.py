@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import bisect
+import collections
+import json
+import logging
+import time
+import typing
+
+# Upper bounds (exclusive) of the message rate histogram buckets, in
+# messages per second. The last bucket is unbounded.
+RATE_HISTOGRAM_BOUNDS = (1, 10, 50, 100, 250, 500, 1000)
+
+
+class _Counts:
+    __slots__ = ("messages_in", "bytes_in", "messages_out", "bytes_out")
+
+    def __init__(self):
+        self.messages_in = 0
+        self.bytes_in = 0
+        self.messages_out = 0
+        self.bytes_out = 0
+
+    def as_dict(self) -> typing.Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# Counts MIDI messages and bytes sent to and received from the
+# controller, per element, per mode and per second, and keeps a
+# histogram of per-second message rates over a rolling window.
+#
+# This is only created when instrumentation is enabled in the
+# configuration. Otherwise, the send and receive paths just skip a
+# `None` check.
+class MidiTrafficMonitor:
+    def __init__(
+        self,
+        window_seconds: int = 60,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param int window_seconds: number of past seconds covered by the rate
+                                   histogram.
+        """
+        self._clock = clock
+        self._start_time = clock()
+
+        # Name of the currently active mode.
+        self.mode: typing.Optional[str] = None
+
+        self._totals = _Counts()
+        self._per_element: typing.Dict[str, _Counts] = collections.defaultdict(_Counts)
+        self._per_mode: typing.Dict[
+            typing.Optional[str], _Counts
+        ] = collections.defaultdict(_Counts)
+
+        # Message count (in and out) for the current second, and for
+        # each completed second in the window.
+        self._current_second = 0
+        self._current_second_messages = 0
+        self._per_second: typing.Deque[int] = collections.deque(maxlen=window_seconds)
+
+    def record_output(self, element_name: str, num_bytes: int):
+        self._advance()
+        for counts in (
+            self._totals,
+            self._per_element[element_name],
+            self._per_mode[self.mode],
+        ):
+            counts.messages_out += 1
+            counts.bytes_out += num_bytes
+
+    def record_input(self, element_name: str, num_bytes: int):
+        self._advance()
+        for counts in (
+            self._totals,
+            self._per_element[element_name],
+            self._per_mode[self.mode],
+        ):
+            counts.messages_in += 1
+            counts.bytes_in += num_bytes
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        self._advance(count=False)
+
+        histogram = [0] * (len(RATE_HISTOGRAM_BOUNDS) + 1)
+        for messages in self._per_second:
+            histogram[bisect.bisect_right(RATE_HISTOGRAM_BOUNDS, messages)] += 1
+
+        labels = [f"<{bound}" for bound in RATE_HISTOGRAM_BOUNDS] + [
+            f">={RATE_HISTOGRAM_BOUNDS[-1]}"
+        ]
+
+        return {
+            "elapsed_seconds": self._clock() - self._start_time,
+            "totals": self._totals.as_dict(),
+            "per_element": {
+                name: counts.as_dict()
+                for name, counts in sorted(self._per_element.items())
+            },
+            "per_mode": {
+                str(mode): counts.as_dict() for mode, counts in self._per_mode.items()
+            },
+            "messages_per_second": list(self._per_second),
+            "current_second_messages": self._current_second_messages,
+            "rate_histogram": dict(zip(labels, histogram, strict=True)),
+        }
+
+    def log_snapshot(self, logger: logging.Logger):
+        logger.info(f"MIDI traffic: {json.dumps(self.snapshot())}")
+
+    def write_snapshot(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    # Roll the per-second counters forward to the current time, and
+    # optionally count one message in the current second.
+    def _advance(self, count: bool = True):
+        second = int(self._clock() - self._start_time)
+        if second != self._current_second:
+            self._per_second.append(self._current_second_messages)
+            # Seconds without any traffic.
+            num_idle_seconds = second - self._current_second - 1
+            self._per_second.extend(
+                [0] * min(num_idle_seconds, self._per_second.maxlen or 0)
+            )
+            self._current_second = second
+            self._current_second_messages = 0
+
+        if count:
+            self._current_second_messages += 1
+
+
+# Records how long each phase of control surface startup takes, in
+# seconds, for logging. Phases are reported in the order they're
+# recorded.
+class StartupProfiler:
+    def __init__(self, clock: typing.Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._marks: typing.Dict[str, float] = {}
+        self._timings: typing.Dict[str, float] = {}
+
+    @property
+    def timings(self) -> typing.Dict[str, float]:
+        return dict(self._timings)
+
+    # Remember the current time under the given name.
+    def mark(self, name: str):
+        self._marks[name] = self._clock()
+
+    # Seconds elapsed since the given mark.
+    def since(self, name: str) -> float:
+        return self._clock() - self._marks[name]
+
+    # Seconds elapsed between two marks.
+    def between(self, start_name: str, end_name: str) -> float:
+        return self._marks[end_name] - self._marks[start_name]
+
+    # Record (or re-record) a phase. It's moved to the end of the
+    # timings either way.
+    def record(self, phase: str, seconds: float):
+        self._timings.pop(phase, None)
+        self._timings[phase] = seconds
+
+    def log(self, logger: logging.Logger):
+        logger.info(
+            "startup timings: "
+            + ", ".join(
+                f"{phase} {seconds * 1000:.1f}ms"
+                for phase, seconds in self._timings.items()
+            )
+        )
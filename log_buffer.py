@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import collections
+import logging
+import threading
+import typing
+
+# Number of records kept in memory.
+DEFAULT_CAPACITY = 5000
+
+# How often (in seconds) the background thread writes new records to
+# the log file.
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+# Logging handler which keeps formatted records in a bounded ring
+# buffer, and leaves all disk I/O to a background thread, so that
+# logging never blocks MIDI handling on Live's main thread.
+#
+# Every record which reaches the handler (including debug records, if
+# enabled) is kept in the ring. Records at `file_level` and above are
+# also appended to the log file in batches. When an error is logged,
+# the whole ring is written to `<path>.dump`, so that recent debug
+# context is available without having written it to disk as it
+# happened. If records arrive faster than they're flushed, the oldest
+# ones are dropped, and the number of dropped records is noted in the
+# log file.
+class RingBufferLogHandler(logging.Handler):
+    def __init__(
+        self,
+        path: str,
+        capacity: int = DEFAULT_CAPACITY,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        file_level: int = logging.INFO,
+        *a,
+        **k,
+    ):
+        super().__init__(*a, **k)
+        self._path = path
+        self._capacity = capacity
+        self._flush_interval = flush_interval
+        self._file_level = file_level
+
+        # All recent formatted records, for dumps.
+        self._ring: typing.Deque[str] = collections.deque(maxlen=capacity)
+
+        # Formatted records at `file_level` and above which haven't
+        # been written yet, and the number of such records dropped
+        # since the last write because this was full.
+        self._pending: typing.Deque[str] = collections.deque(maxlen=capacity)
+        self._num_dropped = 0
+
+        self._write_requested = False
+        self._dump_requested = False
+        self._is_closing = False
+
+        # Guards the buffers and flags above. The background thread
+        # only holds it to swap out pending records, never during I/O.
+        self._condition = threading.Condition()
+
+        # Held while writing, so that batches don't interleave.
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="NK2Reshift log writer", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def dump_path(self) -> str:
+        return f"{self._path}.dump"
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._condition:
+            self._ring.append(line)
+            if record.levelno >= self._file_level:
+                if len(self._pending) == self._capacity:
+                    self._num_dropped += 1
+                self._pending.append(line)
+            if record.levelno >= logging.ERROR:
+                self._dump_requested = True
+                self._condition.notify()
+
+    # Write the ring to the dump file on the background thread.
+    def dump(self):
+        with self._condition:
+            self._dump_requested = True
+            self._condition.notify()
+
+    # Ask the background thread to write pending records now. This
+    # doesn't wait for the write, so it's safe to call from Live's
+    # thread. Closing the handler writes everything that's pending.
+    def flush(self):
+        with self._condition:
+            self._write_requested = True
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._is_closing = True
+            self._condition.notify()
+        if self._thread.is_alive():
+            self._thread.join()
+        super().close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not (
+                    self._is_closing or self._dump_requested or self._write_requested
+                ):
+                    self._condition.wait(self._flush_interval)
+                is_closing = self._is_closing
+
+            self._write_pending()
+            if is_closing:
+                return
+
+    def _write_pending(self):
+        with self._write_lock:
+            # Only swap the buffers while holding the lock, so that
+            # `emit` on other threads isn't held up by formatting or
+            # disk I/O.
+            with self._condition:
+                pending = self._pending
+                if pending:
+                    self._pending = collections.deque(maxlen=self._capacity)
+                num_dropped = self._num_dropped
+                self._num_dropped = 0
+                self._write_requested = False
+
+                # Copying the ring is the only full pass made under
+                # the lock, and only happens after an error.
+                dump_lines = list(self._ring) if self._dump_requested else None
+                self._dump_requested = False
+
+            lines = list(pending)
+            if num_dropped > 0:
+                lines.insert(0, f"... {num_dropped} log records dropped")
+            try:
+                if lines:
+                    with open(self._path, "a") as f:
+                        f.write("\n".join(lines) + "\n")
+                if dump_lines is not None:
+                    with open(self.dump_path, "w") as f:
+                        f.write("\n".join(dump_lines) + "\n")
+            except OSError:
+                # Nowhere to report this without blocking.
+                pass
@@ -1,8 +1,8 @@
 import typing
 
 from ableton.v3.base import depends
-from ableton.v3.control_surface import ControlSurface
-from ableton.v3.control_surface.mode import CallFunctionMode
+from ableton.v3.control_surface import ControlSurface, Layer
+from ableton.v3.control_surface.mode import CallFunctionMode, LayerMode, Mode
 
 from .configuration import Configuration
 from .elements import NUM_TRACKS
@@ -11,6 +11,46 @@ SHIFT_BUTTON = "stop_button"
 ALT_BUTTON = "play_button"
 CTRL_BUTTON = "record_button"
 
+# Components which are only used in ctrl mode. With `lazy_components`
+# enabled, these aren't created until ctrl mode is first entered.
+LAZY_COMPONENTS = ("Device", "Device_Navigation", "Recording")
+
+
+# Binds a layer to a component the first time the mode is entered,
+# rather than when mappings are created. This relies on the
+# framework's component map creating components when they're first
+# looked up, and defers the construction of components which are only
+# used in some modes. `benchmarks/startup.py` checks that they're
+# actually absent after startup, and reports the startup timings.
+class LazyLayerMode(Mode):
+    def __init__(
+        self,
+        control_surface: ControlSurface,
+        component_name: str,
+        element_names: typing.Dict[str, str],
+        *a,
+        **k,
+    ):
+        super().__init__(*a, **k)
+        self._control_surface = control_surface
+        self._component_name = component_name
+        self._element_names = element_names
+        self._mode: typing.Optional[LayerMode] = None
+
+    def enter_mode(self):
+        if self._mode is None:
+            # Element names are resolved by the layer, the same way as
+            # for the framework's own layer modes.
+            self._mode = LayerMode(
+                self._control_surface.component_map[self._component_name],
+                Layer(**self._element_names),
+            )
+        self._mode.enter_mode()
+
+    def leave_mode(self):
+        if self._mode is not None:
+            self._mode.leave_mode()
+
 
 @depends(configuration=None)
 def create_mappings(
@@ -19,6 +59,13 @@ def create_mappings(
     assert configuration
     mappings = {}
 
+    # A mode which binds elements to a component's controls, which
+    # defers creating the component if possible.
+    def component_mode(component_name, **element_names):
+        if configuration.lazy_components and component_name in LAZY_COMPONENTS:
+            return LazyLayerMode(control_surface, component_name, element_names)
+        return dict(component=component_name, **element_names)
+
     # Session navigation is always active.
     mappings["Session_Navigation"] = dict(
         up_button="rewind_button",
@@ -32,17 +79,45 @@ def create_mappings(
         volume_controls="sliders",
     )
 
-    # The common setup shared by default, shift, and alt modes.
-    #
-    # The raw object gets modified during mode creation, so we need to
-    # recreate the object whenever it's needed.
-    def sends_mode():
-        return dict(
+    # The knobs and marker buttons control sends in default, shift,
+    # and alt modes, and the selected device in ctrl mode. These
+    # bindings live in their own modes component, so that switching
+    # between modes which share the same binding (e.g. default to
+    # shift) doesn't release and rebind them. Only transitions into or
+    # out of ctrl mode actually change the owner of these elements.
+    mappings["Knob_Modes"] = dict(
+        sends=dict(
             component="Mixer",
             send_controls="knobs",
             next_send_index_button="marker_right_button",
             prev_send_index_button="marker_left_button",
-        )
+        ),
+        device=dict(
+            modes=[
+                component_mode(
+                    "Device",
+                    parameter_controls="knobs",
+                    device_lock_button="marker_set_button",
+                    device_on_off_button="cycle_button",
+                ),
+                component_mode(
+                    "Device_Navigation",
+                    prev_button="marker_left_button",
+                    next_button="marker_right_button",
+                ),
+            ]
+        ),
+    )
+
+    # Select the knob binding for a main mode. This is a no-op if the
+    # binding is already active.
+    def set_knob_mode(knob_mode_name):
+        def on_enter():
+            knob_modes = control_surface.component_map["Knob_Modes"]
+            if knob_modes.selected_mode != knob_mode_name:
+                knob_modes.selected_mode = knob_mode_name
+
+        return CallFunctionMode(on_enter_fn=on_enter)
 
     # A mode that just selects another mode. We use this to get a
     # different button color when selecting e.g. SHIFT mode from
@@ -55,6 +130,17 @@ def create_mappings(
 
         return CallFunctionMode(on_enter_fn=on_enter)
 
+    # With `solo_meters`, show output meters on the solo buttons while
+    # the mode is active.
+    def solo_meters_mode():
+        def set_enabled(enabled):
+            control_surface.component_map["Mixer"].set_solo_meters_enabled(enabled)
+
+        return CallFunctionMode(
+            on_enter_fn=lambda: set_enabled(True),
+            on_exit_fn=lambda: set_enabled(False),
+        )
+
     mappings["Modes"] = dict(
         initial=set_selected_mode_mode(configuration.initial_mode),
         # Use wrapper modes to get a different button color when DEFAULT is active.
@@ -63,11 +149,11 @@ def create_mappings(
         ctrl_from_default_button=CTRL_BUTTON,
         default=dict(
             modes=[
+                set_knob_mode("sends"),
                 dict(
                     component="Session",
                     clip_launch_buttons="mixer_buttons",
                 ),
-                sends_mode(),
             ]
         ),
         shift_from_default=set_selected_mode_mode("shift"),
@@ -75,23 +161,25 @@ def create_mappings(
         ctrl_from_default=set_selected_mode_mode("ctrl"),
         shift=dict(
             modes=[
+                set_knob_mode("sends"),
                 dict(
                     component="Mixer",
                     solo_buttons="solo_buttons",
                     mute_buttons="mute_buttons",
                     arm_buttons="arm_buttons",
                 ),
+                *([solo_meters_mode()] if configuration.solo_meters else []),
                 dict(
                     component="Modes",
                     default_button=SHIFT_BUTTON,
                     alt_button=ALT_BUTTON,
                     ctrl_button=CTRL_BUTTON,
                 ),
-                sends_mode(),
             ]
         ),
         alt=dict(
             modes=[
+                set_knob_mode("sends"),
                 dict(
                     component="Session",
                     stop_track_clip_buttons="arm_buttons",
@@ -107,22 +195,11 @@ def create_mappings(
                     default_button=ALT_BUTTON,
                     ctrl_button=CTRL_BUTTON,
                 ),
-                sends_mode(),
             ]
         ),
         ctrl=dict(
             modes=[
-                dict(
-                    component="Device",
-                    parameter_controls="knobs",
-                    device_lock_button="marker_set_button",
-                    device_on_off_button="cycle_button",
-                ),
-                dict(
-                    component="Device_Navigation",
-                    prev_button="marker_left_button",
-                    next_button="marker_right_button",
-                ),
+                set_knob_mode("device"),
                 dict(component="Mixer", clip_view_buttons="solo_buttons"),
                 dict(
                     component="Transport",
@@ -133,8 +210,8 @@ def create_mappings(
                     tempo_up_button=f"mixer_buttons_raw[{2 * NUM_TRACKS + 5}]",
                     metronome_button=f"mixer_buttons_raw[{2 * NUM_TRACKS + 6}]",
                 ),
-                dict(
-                    component="Recording",
+                component_mode(
+                    "Recording",
                     arrangement_record_button=f"mixer_buttons_raw[{2 * NUM_TRACKS + 2}]",
                 ),
                 dict(
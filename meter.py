@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import typing
+
+from ableton.v3.base import depends, task
+
+from .configuration import Configuration
+
+if typing.TYPE_CHECKING:
+    from .channel_strip import ChannelStripComponent
+
+# Number of ticks (100ms each) for which a peak keeps its LED lit
+# after the level drops.
+PEAK_HOLD_TICKS = 3
+
+# Factor applied to a held peak on each tick once the hold time has
+# passed.
+PEAK_DECAY = 0.7
+
+
+# Peak-hold state for a single output meter, reduced to whether its
+# LED should be lit. Peaks are held for a few ticks and then decay, so
+# short transients are still visible.
+class PeakMeter:
+    def __init__(self):
+        self.is_lit = False
+        self._held_level = 0.0
+        self._hold_ticks = 0
+
+    def reset(self):
+        self.is_lit = False
+        self._held_level = 0.0
+        self._hold_ticks = 0
+
+    # Returns whether `is_lit` changed.
+    def sample(self, level: float, threshold: float) -> bool:
+        if level >= self._held_level:
+            self._held_level = level
+            self._hold_ticks = PEAK_HOLD_TICKS
+        elif self._hold_ticks > 0:
+            self._hold_ticks -= 1
+        else:
+            self._held_level = max(level, self._held_level * PEAK_DECAY)
+
+        is_lit = self._held_level >= threshold
+        if is_lit == self.is_lit:
+            return False
+        self.is_lit = is_lit
+        return True
+
+
+# Samples the output meters of a mixer's channel strips, in one pass
+# over all strips per scheduler tick, rather than by listening to
+# every track's meter level (which changes far more often than the
+# LEDs can usefully be updated).
+class MeterSampler:
+    def __init__(self, strips: typing.Sequence[ChannelStripComponent]):
+        self._strips = strips
+        self._sample_task: typing.Optional[task.Task] = None
+
+    # The task group is only available while a control surface is
+    # active, so it's looked up whenever sampling starts.
+    @depends(parent_task_group=None)
+    def start(self, parent_task_group=None):
+        assert parent_task_group
+        if self._sample_task is None:
+            self._sample_task = parent_task_group.add(task.loop(task.run(self.sample)))
+
+    def stop(self):
+        if self._sample_task is not None:
+            self._sample_task.kill()
+            self._sample_task = None
+
+    # The threshold is looked up on each pass, so that it follows
+    # `NK2Reshift.reload_configuration`.
+    @depends(configuration=None)
+    def sample(self, configuration: typing.Optional[Configuration] = None):
+        assert configuration
+        threshold = configuration.solo_meter_threshold
+        for strip in self._strips:
+            strip.sample_meter(threshold)
@@ -1,13 +1,19 @@
 import typing
 from itertools import zip_longest
 
-from ableton.v3.base import depends
+from ableton.v3.base import MultiSlot, depends
 from ableton.v3.control_surface.components import MixerComponent as MixerComponentBase
 
 from .channel_strip import ChannelStripComponent
+from .deferred_updates import DeferredUpdateMixin
+from .meter import MeterSampler
+from .tracing import traced
 
+# Views which need to be visible for the device view to be showing.
+DEVICE_VIEW_NAMES = ("Detail", "Detail/DeviceChain")
 
-class MixerComponent(MixerComponentBase):
+
+class MixerComponent(DeferredUpdateMixin, MixerComponentBase):
     @depends(show_message=None)
     def __init__(
         self,
@@ -25,7 +31,32 @@ class MixerComponent(MixerComponentBase):
 
         self._clip_view_buttons = None
         self._reset_send_buttons = None
+        self._meter_sampler = MeterSampler(self._channel_strips)
+
+        # Listen for view changes once for all strips, rather than
+        # once per strip.
+        for view_name in DEVICE_VIEW_NAMES:
+            self.register_slot(
+                MultiSlot(
+                    subject=(self.application.view),
+                    listener=(self._update_strip_view_state),
+                    event_name_list=("is_view_visible",),
+                    extra_args=(view_name,),
+                )
+            )
 
+        assert self.song
+
+        # This will also fire when tracks are added/removed from the set.
+        self.register_slot(
+            self.song.view, self._update_strip_view_state, "selected_track"
+        )
+
+        self._update_strip_view_state()
+
+    # Strip updates are deferred until the end of the current event or
+    # tick, so a strip whose clip view and reset send buttons are both
+    # set during a mode change only gets updated once.
     def set_clip_view_buttons(self, buttons):
         self._clip_view_buttons = buttons
         for strip, button in zip_longest(self._channel_strips, buttons or []):
@@ -40,6 +71,38 @@ class MixerComponent(MixerComponentBase):
             strip.reset_send_button.set_control_element(button)
             strip.update()
 
+    # Show output meters on the strips' solo buttons instead of their
+    # solo states. Presses still toggle solo.
+    def set_solo_meters_enabled(self, enabled: bool):
+        for strip in self._channel_strips:
+            assert isinstance(strip, ChannelStripComponent)
+            strip.set_solo_meter_enabled(enabled)
+
+        if enabled:
+            self._meter_sampler.start()
+        else:
+            self._meter_sampler.stop()
+
+    def disconnect(self):
+        self._meter_sampler.stop()
+        super().disconnect()
+
+    # Compute the view state needed by the strips' clip view buttons,
+    # and push it to all strips in a single pass.
+    @traced("Mixer.update_strip_view_state")
+    def _update_strip_view_state(self, *_):
+        assert self.song
+        view = self.application.view
+        is_device_view_visible = all(
+            view.is_view_visible(view_name) for view_name in DEVICE_VIEW_NAMES
+        )
+        selected_track = self.song.view.selected_track
+
+        for strip in self._channel_strips:
+            assert isinstance(strip, ChannelStripComponent)
+            strip.set_view_state(is_device_view_visible, selected_track)
+
+    @traced("Mixer.on_send_index_changed")
     def _on_send_index_changed(self):
         self._show_message(
             f"Controlling Send {self._send_index_control.send_index + 1}"
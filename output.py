@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import time
+import typing
+from contextlib import contextmanager
+
+if typing.TYPE_CHECKING:
+    from .elements import BlinkingButtonElement
+    from .instrumentation import MidiTrafficMonitor
+
+# (msg_type, channel, identifier)
+OutputKey = typing.Tuple[int, int, int]
+
+# Number of bytes in a note or CC message.
+SHORT_MESSAGE_LENGTH = 3
+
+# Maximum number of messages which can be sent in a single burst when
+# rate limiting is enabled.
+DEFAULT_BURST_SIZE = 32
+
+_Entry = typing.Tuple["BlinkingButtonElement", int, bool, typing.Optional[int]]
+
+
+# Output stage for LED values. While a frame is open (i.e. during a
+# scheduler tick or while handling an input event), values sent to
+# buttons are collected rather than being sent immediately. When the
+# outermost frame closes, only the final value for each LED is sent,
+# and only if it differs from the value that was last sent to the
+# device.
+#
+# This avoids flicker and redundant MIDI traffic when e.g. a mode
+# change causes the same LED to be redrawn several times.
+#
+# Optionally, output can also be rate limited with a token bucket. When
+# the budget is exhausted, remaining values are deferred to the next
+# flush (i.e. the next tick at the latest), with only the newest value
+# kept for each LED. Values for priority LEDs (e.g. mode buttons, or a
+# button which was just pressed) are sent ahead of everything else.
+class LedOutput:
+    def __init__(
+        self,
+        monitor: typing.Optional[MidiTrafficMonitor] = None,
+        messages_per_ms: float = 0.0,
+        burst_size: int = DEFAULT_BURST_SIZE,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param monitor: if set, every message sent to the device is recorded here.
+        :param float messages_per_ms: output budget for rate limiting. If 0, output
+                                      isn't rate limited.
+        :param int burst_size: maximum number of messages which can be sent at once
+                               when rate limiting.
+        """
+        self._monitor = monitor
+
+        self._messages_per_ms = messages_per_ms
+        self._burst_size = burst_size
+        self._clock = clock
+        self._tokens = float(burst_size)
+        self._last_refill_time = clock()
+
+        # LEDs which always get sent first, and LEDs which get sent
+        # first during the current frame only.
+        self._priority_elements: typing.List[BlinkingButtonElement] = []
+        self._priority_keys: typing.Set[OutputKey] = set()
+        self._frame_priority_keys: typing.Set[OutputKey] = set()
+
+        # Values which couldn't be sent within the budget.
+        self._deferred: typing.Dict[OutputKey, _Entry] = {}
+
+        # Last value actually sent for each LED, and the element it
+        # was sent through.
+        self._shadow: typing.Dict[OutputKey, int] = {}
+        self._shadow_elements: typing.Dict[OutputKey, BlinkingButtonElement] = {}
+
+        # While nonzero, the shadow is assumed to match the hardware,
+        # i.e. requests to clear it or force values are ignored.
+        self._trust_shadow_depth = 0
+
+        # Values waiting to be sent when the current frame closes,
+        # as (element, value, force, channel).
+        self._pending: typing.Dict[OutputKey, _Entry] = {}
+
+        self._frame_depth = 0
+
+    @contextmanager
+    def frame(self):
+        self._frame_depth += 1
+        try:
+            yield
+        finally:
+            self._frame_depth -= 1
+            if self._frame_depth == 0:
+                self.flush()
+
+    def send_value(
+        self,
+        element: BlinkingButtonElement,
+        value: int,
+        force: bool = False,
+        channel: typing.Optional[int] = None,
+    ):
+        key = element.output_key if channel is None else self.key_for(element, channel)
+        if self._trust_shadow_depth > 0:
+            force = False
+
+        # If any write to this LED since the last send was forced,
+        # the final value needs to be forced as well.
+        previous = self._pending.get(key) or self._deferred.get(key)
+        if previous is not None and previous[2]:
+            force = True
+
+        if self._frame_depth > 0:
+            self._pending[key] = (element, value, force, channel)
+        elif self._messages_per_ms > 0:
+            self._pending[key] = (element, value, force, channel)
+            self.flush()
+        else:
+            self._send(key, element, value, force, channel)
+
+    def flush(self):
+        # This runs at the end of every tick, so avoid allocating when
+        # there's nothing to send.
+        if not self._pending and not self._deferred:
+            self._frame_priority_keys.clear()
+            return
+
+        pending = self._pending
+        self._pending = {}
+        frame_priority_keys = self._frame_priority_keys
+        if frame_priority_keys:
+            self._frame_priority_keys = set()
+
+        if self._messages_per_ms <= 0:
+            for key, (element, value, force, channel) in pending.items():
+                self._send(key, element, value, force, channel)
+            return
+
+        # Newer values replace deferred ones for the same LED.
+        entries = self._deferred
+        self._deferred = {}
+        entries.update(pending)
+
+        self._refill()
+        for is_priority in (True, False):
+            for key, entry in entries.items():
+                if (
+                    key in self._priority_keys or key in frame_priority_keys
+                ) is not is_priority:
+                    continue
+
+                element, value, force, channel = entry
+                if not (force or self._shadow.get(key) != value):
+                    continue
+                if self._tokens < 1:
+                    self._deferred[key] = entry
+                    continue
+
+                self._tokens -= 1
+                self._send(key, element, value, force, channel)
+
+    # Send the last value of every LED to the device again, e.g. after
+    # it has been reconnected. Values go through the rate limiter
+    # along with everything else, with priority LEDs first.
+    def replay(self):
+        with self.frame():
+            for key, value in self._shadow.items():
+                if key not in self._pending:
+                    self._pending[key] = (
+                        self._shadow_elements[key],
+                        value,
+                        True,
+                        key[1],
+                    )
+
+    # Assume that the hardware matches the shadow while the context is
+    # active, e.g. during a full redraw right after a replay. Redundant
+    # values are dropped even if they'd normally be forced.
+    @contextmanager
+    def trusting_shadow(self):
+        self._trust_shadow_depth += 1
+        try:
+            yield
+        finally:
+            self._trust_shadow_depth -= 1
+
+    # Send values for this element ahead of others from now on.
+    def add_priority_element(self, element: BlinkingButtonElement):
+        self._priority_elements.append(element)
+        self._priority_keys.add(element.output_key)
+
+    # Recompute the keys of priority elements, e.g. after they've been
+    # rebound to different MIDI addresses.
+    def update_priority_keys(self):
+        self._priority_keys = {
+            element.output_key for element in self._priority_elements
+        }
+
+    # Send values for this element ahead of others until the end of the
+    # current frame, e.g. because it was just pressed.
+    def prioritize_for_frame(self, element: BlinkingButtonElement):
+        self._frame_priority_keys.add(element.output_key)
+
+    @property
+    def num_deferred(self) -> int:
+        return len(self._deferred)
+
+    # Forget the last value sent for an LED, so that the next value
+    # gets sent regardless. This should be called whenever the
+    # hardware state might have diverged from what we've sent.
+    def clear_shadow(self, key: typing.Optional[OutputKey] = None):
+        if self._trust_shadow_depth > 0:
+            return
+        if key is None:
+            self._shadow.clear()
+            self._shadow_elements.clear()
+        else:
+            self._shadow.pop(key, None)
+            self._shadow_elements.pop(key, None)
+
+    # Drop any state for an LED, e.g. because its element is being
+    # moved to a different MIDI address.
+    def discard(self, key: OutputKey):
+        self._pending.pop(key, None)
+        self._deferred.pop(key, None)
+        self._shadow.pop(key, None)
+        self._shadow_elements.pop(key, None)
+
+    # Turn off an LED right away and drop any state for it, e.g.
+    # because its element is being moved to a different MIDI address.
+    # This can't wait for the end of the frame, by which time the
+    # element would send to its new address.
+    def clear_now(self, element: BlinkingButtonElement):
+        self.discard(element.output_key)
+        element._send_value_now(0, True, None)
+        if self._monitor is not None:
+            self._monitor.record_output(element.name, SHORT_MESSAGE_LENGTH)
+
+    @staticmethod
+    def key_for(
+        element: BlinkingButtonElement, channel: typing.Optional[int] = None
+    ) -> OutputKey:
+        return (
+            element.message_type(),
+            element.message_channel() if channel is None else channel,
+            element.message_identifier(),
+        )
+
+    def _refill(self):
+        now = self._clock()
+        elapsed_ms = (now - self._last_refill_time) * 1000.0
+        self._last_refill_time = now
+        self._tokens = min(
+            float(self._burst_size), self._tokens + elapsed_ms * self._messages_per_ms
+        )
+
+    def _send(
+        self,
+        key: OutputKey,
+        element: BlinkingButtonElement,
+        value: int,
+        force: bool,
+        channel: typing.Optional[int],
+    ):
+        if force or self._shadow.get(key) != value:
+            self._shadow[key] = value
+            self._shadow_elements[key] = element
+            element._send_value_now(value, force, channel)
+            if self._monitor is not None:
+                self._monitor.record_output(element.name, SHORT_MESSAGE_LENGTH)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import collections
+import functools
+import json
+import logging
+import time
+import typing
+
+# Number of recent latencies kept per handler for percentiles.
+DEFAULT_MAX_SAMPLES = 1000
+
+
+# Nearest-rank percentile of a non-empty, sorted sequence.
+def percentile(ordered: typing.Sequence[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+# Latencies of traced handlers, keyed by handler name. The most recent
+# latencies are kept for percentiles, along with the total count and
+# the all-time maximum.
+class HandlerTracer:
+    def __init__(
+        self,
+        max_samples: int = DEFAULT_MAX_SAMPLES,
+        clock: typing.Callable[[], float] = time.perf_counter,
+    ):
+        self.clock = clock
+        self._max_samples = max_samples
+        self._samples: typing.Dict[str, typing.Deque[float]] = {}
+        self._counts: typing.Dict[str, int] = collections.defaultdict(int)
+        self._max_latencies: typing.Dict[str, float] = collections.defaultdict(float)
+
+    def record(self, name: str, seconds: float):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = collections.deque(maxlen=self._max_samples)
+            self._samples[name] = samples
+        samples.append(seconds)
+        self._counts[name] += 1
+        if seconds > self._max_latencies[name]:
+            self._max_latencies[name] = seconds
+
+    # Latency percentiles per handler, in milliseconds, slowest (by
+    # p99) first.
+    def snapshot(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        results = {}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            results[name] = {
+                "count": self._counts[name],
+                "p50_ms": percentile(ordered, 0.5) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": self._max_latencies[name] * 1000,
+            }
+        return dict(
+            sorted(results.items(), key=lambda item: item[1]["p99_ms"], reverse=True)
+        )
+
+    def log_snapshot(self, logger: logging.Logger):
+        logger.info(f"handler latencies: {json.dumps(self.snapshot())}")
+
+    def write_snapshot(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+# The active tracer, if tracing is enabled.
+_tracer: typing.Optional[HandlerTracer] = None
+
+
+def enable_tracing(max_samples: int = DEFAULT_MAX_SAMPLES) -> HandlerTracer:
+    global _tracer
+    _tracer = HandlerTracer(max_samples=max_samples)
+    return _tracer
+
+
+def disable_tracing():
+    global _tracer
+    _tracer = None
+
+
+def get_tracer() -> typing.Optional[HandlerTracer]:
+    return _tracer
+
+
+_F = typing.TypeVar("_F", bound=typing.Callable[..., typing.Any])
+
+
+# Record the latency of each call to the decorated function under the
+# given name, while tracing is enabled. When it's disabled, the only
+# overhead is a global lookup.
+def traced(name: str) -> typing.Callable[[_F], _F]:
+    def decorator(fn: _F) -> _F:
+        @functools.wraps(fn)
+        def wrapper(*a, **k):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*a, **k)
+
+            start_time = tracer.clock()
+            try:
+                return fn(*a, **k)
+            finally:
+                tracer.record(name, tracer.clock() - start_time)
+
+        return typing.cast(_F, wrapper)
+
+    return decorator
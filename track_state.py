@@ -0,0 +1,55 @@
+import typing
+
+from ableton.v3.base import EventObject, listens
+from ableton.v3.live import liveobj_valid
+
+from .tracing import traced
+
+
+# Mirrors the properties of a track which are needed on every channel
+# strip update, so that they can be read as plain Python fields
+# instead of going through the Live Object Model each time.
+#
+# The fields are refreshed when the track is assigned, and kept
+# current by listeners on the track's sends and clip slots.
+class TrackState(EventObject):
+    def __init__(self, on_changed: typing.Callable[[], typing.Any], *a, **k):
+        """
+        :param on_changed: invoked whenever the sends or clip slots of the current
+                           track change.
+        """
+        super().__init__(*a, **k)
+        self._on_changed = on_changed
+
+        self.is_valid = False
+        self.is_master = False
+        self.num_sends = 0
+        self.num_clip_slots = 0
+
+    def set_track(self, track, song):
+        self.is_valid = bool(track) and liveobj_valid(track)
+        if self.is_valid:
+            self.is_master = song is not None and track == song.master_track
+            self.num_sends = len(track.mixer_device.sends)
+            self.num_clip_slots = len(track.clip_slots)
+        else:
+            self.is_master = False
+            self.num_sends = 0
+            self.num_clip_slots = 0
+
+        self.__on_sends_changed.subject = track.mixer_device if self.is_valid else None
+        self.__on_clip_slots_changed.subject = track if self.is_valid else None
+
+    @listens("sends")
+    @traced("TrackState.on_sends_changed")
+    def __on_sends_changed(self):
+        mixer_device = self.__on_sends_changed.subject
+        self.num_sends = len(mixer_device.sends) if mixer_device else 0
+        self._on_changed()
+
+    @listens("clip_slots")
+    @traced("TrackState.on_clip_slots_changed")
+    def __on_clip_slots_changed(self):
+        track = self.__on_clip_slots_changed.subject
+        self.num_clip_slots = len(track.clip_slots) if track else 0
+        self._on_changed()
@@ -6,6 +6,9 @@ from ableton.v3.control_surface.components import (
 )
 from ableton.v3.control_surface.controls import ButtonControl
 
+from .deferred_updates import DeferredUpdateMixin
+from .tracing import traced
+
 TEMPO_MIN = 20.0
 TEMPO_MAX = 999.0
 
@@ -18,7 +21,7 @@ IGNORED_QUANTIZATIONS = [
 ]
 
 
-class TransportComponent(TransportComponentBase):
+class TransportComponent(DeferredUpdateMixin, TransportComponentBase):
     tempo_up_button: typing.Any = ButtonControl(
         color="DefaultButton.Off", pressed_color="DefaultButton.On"
     )
@@ -30,14 +33,17 @@ class TransportComponent(TransportComponentBase):
     )
 
     @tempo_up_button.pressed
+    @traced("Transport.tempo_up_button.pressed")
     def tempo_up_button(self, _):
         self._adjust_tempo(1)
 
     @tempo_down_button.pressed
+    @traced("Transport.tempo_down_button.pressed")
     def tempo_down_button(self, _):
         self._adjust_tempo(-1)
 
     @clip_trigger_quantization_button.pressed
+    @traced("Transport.clip_trigger_quantization_button.pressed")
     def clip_trigger_quantization_button(self, _):
         assert self.song
         self.song.clip_trigger_quantization = self._get_next_clip_trigger_quantization(